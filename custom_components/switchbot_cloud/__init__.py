@@ -8,11 +8,14 @@ import asyncio
 
 from datetime import timedelta
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_USERNAME, CONF_PASSWORD, EVENT_HOMEASSISTANT_STOP
+from homeassistant.const import CONF_USERNAME, CONF_PASSWORD
 from homeassistant.core import Config, HomeAssistant
+from homeassistant.exceptions import ConfigEntryNotReady
 
 from .account import SwitchBotCloudAccount
-from .const import DOMAIN, LOGGER, STARTUP_MESSAGE
+from .api import SwitchBotCloudApiError
+from .const import DATA_ENGINE, DOMAIN, LOGGER, STARTUP_MESSAGE
+from .engine import SwitchBotCloudEngine
 
 SCAN_INTERVAL = timedelta(minutes=5)
 
@@ -24,24 +27,46 @@ async def async_setup(hass: HomeAssistant, config: Config) -> bool:
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Set up this integration using UI."""
-    if hass.data.get(DOMAIN) is None:
-        hass.data.setdefault(DOMAIN, {})
+    hass.data.setdefault(DOMAIN, {})
+
+    if DATA_ENGINE not in hass.data[DOMAIN]:
         LOGGER.info(STARTUP_MESSAGE)
 
-    account = SwitchBotCloudAccount(hass, config_entry)
+        hass.data[DOMAIN][DATA_ENGINE] = SwitchBotCloudEngine(hass)
 
-    if not await account.async_setup():
-        return False
+    account = SwitchBotCloudAccount(hass, config_entry, hass.data[DOMAIN][DATA_ENGINE])
 
-    hass.data[DOMAIN][config_entry.entry_id] = account
+    try:
+        await account.async_setup()
+    except SwitchBotCloudApiError as err:
+        await _async_reset_account(hass, account)
+        raise ConfigEntryNotReady(
+            f"Unable to set up {account.username}: {err}"
+        ) from err
+    except Exception:
+        await _async_reset_account(hass, account)
+        raise
 
-    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, account.shutdown)
+    hass.data[DOMAIN][config_entry.entry_id] = account
 
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Unload config entry."""
-    account = hass.data[DOMAIN].pop(config_entry.unique_id)
+    account = hass.data[DOMAIN].pop(config_entry.entry_id)
+
+    return await _async_reset_account(hass, account)
 
-    return await account.async_reset()
+
+async def _async_reset_account(
+    hass: HomeAssistant, account: SwitchBotCloudAccount
+) -> bool:
+    """Reset an account and stop the engine once no account is left."""
+    if not await account.async_reset():
+        return False
+
+    if not account.engine.coordinators:
+        hass.data[DOMAIN].pop(DATA_ENGINE).async_stop()
+
+    return True
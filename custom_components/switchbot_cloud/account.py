@@ -1,19 +1,64 @@
 """Account Class."""
+import asyncio
+
+from aiohttp import web
+from homeassistant.components import webhook
+from homeassistant.components.cover import DOMAIN as COVER_DOMAIN
+from homeassistant.components.sensor import DOMAIN as SENSOR_DOMAIN
+from homeassistant.components.switch import DOMAIN as SWITCH_DOMAIN
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_USERNAME, CONF_PASSWORD
+from homeassistant.const import (
+    CONF_USERNAME,
+    CONF_PASSWORD,
+    CONF_WEBHOOK_ID,
+    EVENT_HOMEASSISTANT_STOP,
+)
 from homeassistant.core import callback
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.device_registry import (
+    async_get as async_get_device_registry,
+)
 from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.entity_registry import (
+    async_get as async_get_entity_registry,
+)
+from homeassistant.helpers.storage import Store
 
-from .api import SwitchBotCloudApiClient
+from .api import (
+    SwitchBotCloudApiClient,
+    SwitchBotCloudApiError,
+    SwitchBotCloudPushError,
+)
+from .budget import DEFAULT_DAILY_LIMIT
+from .commands import DEFAULT_MAX_CONCURRENT_COMMANDS
 from .const import (
+    CONF_BATTERY_DEADBAND,
+    CONF_DAILY_LIMIT,
+    CONF_EXECUTOR_QUEUE_DEPTH,
+    CONF_EXECUTOR_TIMEOUT,
+    CONF_MAX_CONCURRENT_COMMANDS,
+    CONF_POSITION_TOLERANCE,
+    CONF_PUSH,
+    DATA_FLOW_STATE,
+    DEFAULT_BATTERY_DEADBAND,
+    DEFAULT_POSITION_TOLERANCE,
     DOMAIN,
     LOGGER,
+    NAME,
     NEW_COVER,
     NEW_SENSOR,
     NEW_SWITCH,
-    SUPPORTED_PLATFORMS,
+    STORAGE_KEY,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+)
+from .coordinator import SwitchBotCloudDataUpdateCoordinator
+from .device import SwitchBotCloudDevice
+from .engine import SwitchBotCloudEngine
+from .executor import (
+    DEFAULT_EXECUTOR_QUEUE_DEPTH,
+    DEFAULT_EXECUTOR_TIMEOUT,
+    SwitchBotCloudExecutor,
 )
 
 
@@ -21,8 +66,27 @@ DEVICE_TYPE_MAPPING = {
     "Curtain": [NEW_COVER, NEW_SENSOR],
     "CurtainGroup": [NEW_COVER, NEW_SENSOR],
     "Bot": [NEW_SWITCH],
+    "Meter": [NEW_SENSOR],
+    "Plug": [NEW_SWITCH],
 }
 
+PLATFORM_MAPPING = {
+    NEW_COVER: COVER_DOMAIN,
+    NEW_SENSOR: SENSOR_DOMAIN,
+    NEW_SWITCH: SWITCH_DOMAIN,
+}
+
+
+def _descriptor_hash(device: SwitchBotCloudDevice) -> int:
+    """Return a hash of the parts of a device that define its entities."""
+    return hash(
+        (
+            device.type,
+            device.name,
+            tuple((child.id, child.name) for child in device.children),
+        )
+    )
+
 
 @callback
 def get_account_from_config_entry(hass, config_entry):
@@ -33,17 +97,33 @@ def get_account_from_config_entry(hass, config_entry):
 class SwitchBotCloudAccount:
     """Account Class."""
 
-    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry: ConfigEntry,
+        engine: SwitchBotCloudEngine,
+    ) -> None:
         """Initialize the account."""
         self.hass = hass
         self.config_entry = config_entry
+        self.engine = engine
 
         self.client = None
+        self.coordinator = None
+        self.executor = None
+        self.webhook_id = None
+        self.store = Store(hass, STORAGE_VERSION, STORAGE_KEY.format(self.id))
+        self.devices = {}
         self.known_ids = {}
         self.listeners = []
+        self.platforms = set()
+        self.tasks = set()
+
+        self._setup_tasks = set()
+        self._unsub_stop = None
 
         for type in [NEW_COVER, NEW_SENSOR, NEW_SWITCH]:
-            self.known_ids[type] = []
+            self.known_ids[type] = set()
 
     @property
     def id(self) -> str:
@@ -55,6 +135,37 @@ class SwitchBotCloudAccount:
         """Return the username of the account."""
         return self.config_entry.data[CONF_USERNAME]
 
+    @property
+    def daily_limit(self) -> int:
+        """Return the daily request limit of the account."""
+        return self.config_entry.options.get(CONF_DAILY_LIMIT, DEFAULT_DAILY_LIMIT)
+
+    @property
+    def max_concurrent_commands(self) -> int:
+        """Return the number of commands that may be sent at once."""
+        return self.config_entry.options.get(
+            CONF_MAX_CONCURRENT_COMMANDS, DEFAULT_MAX_CONCURRENT_COMMANDS
+        )
+
+    @property
+    def executor_queue_depth(self) -> int:
+        """Return the number of blocking calls that may wait for a worker."""
+        return self.config_entry.options.get(
+            CONF_EXECUTOR_QUEUE_DEPTH, DEFAULT_EXECUTOR_QUEUE_DEPTH
+        )
+
+    @property
+    def executor_timeout(self) -> int:
+        """Return the seconds a blocking call may take."""
+        return self.config_entry.options.get(
+            CONF_EXECUTOR_TIMEOUT, DEFAULT_EXECUTOR_TIMEOUT
+        )
+
+    @property
+    def push(self) -> bool:
+        """Return true if state changes are pushed to a webhook."""
+        return self.config_entry.options.get(CONF_PUSH, False)
+
     @callback
     def async_signal_new_device(self, device_type: str) -> str:
         """Return event to signal new device."""
@@ -66,42 +177,178 @@ class SwitchBotCloudAccount:
 
         return new_device[device_type]
 
-    async def async_setup(self) -> bool:
-        """Set up an account."""
+    async def async_setup(self) -> None:
+        """Set up an account.
+
+        When devices were stored by a previous run their entities are created
+        straight away and the cloud is reconciled in the background. The login
+        and devices fetched by the config flow are used as they are. Errors are
+        raised as they are, the account must be reset after a failed setup.
+        """
         username = self.config_entry.data.get(CONF_USERNAME)
         password = self.config_entry.data.get(CONF_PASSWORD)
 
-        session = async_get_clientsession(self.hass)
-        self.client = SwitchBotCloudApiClient(session)
-        await self.client.authenticate(username, password)
+        self.executor = SwitchBotCloudExecutor(
+            self.executor_queue_depth, self.executor_timeout
+        )
+        self.client = SwitchBotCloudApiClient(
+            self.engine.session,
+            self.daily_limit,
+            self.max_concurrent_commands,
+            self.executor,
+        )
+        self.coordinator = SwitchBotCloudDataUpdateCoordinator(
+            self.hass, self.engine, self.client, f"{DOMAIN}_{username}"
+        )
+        self.engine.async_add(self.coordinator)
+        self.async_apply_deadbands()
+        self.async_apply_push()
+
+        self.client.set_credentials(username, password)
+
+        stored = self.hass.data[DOMAIN].get(DATA_FLOW_STATE, {}).pop(username, None)
+        fresh = bool(stored and stored["devices"])
+
+        if stored is None:
+            stored = await self.store.async_load()
+
+        if stored:
+            LOGGER.debug("Restoring stored devices for %s", username)
+
+            self.coordinator.data = self.client.restore_state(stored, fresh)
+            self.coordinator.restored = not fresh
+            self.async_update_devices_callback()
+        else:
+            await self.client.authenticate(username, password)
+
+        self.listeners.append(
+            self.coordinator.async_add_listener(self.async_update_devices_callback)
+        )
+        self.listeners.append(
+            self.coordinator.async_add_listener(self.async_save_devices_callback)
+        )
+        self.listeners.append(
+            self.config_entry.add_update_listener(self.async_options_updated)
+        )
+
+        self._unsub_stop = self.hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, self.shutdown
+        )
+
+        if fresh:
+            self.async_save_devices_callback()
+            self.coordinator.async_poll_soon()
+        elif stored:
+            self.async_create_task(self.async_reconcile(username, password))
+        else:
+            await self.coordinator.async_refresh()
+
+        # The sensor platform also holds the account sensors.
+        self.async_load_platforms(
+            [NEW_SENSOR]
+            + [type for type in PLATFORM_MAPPING if self.async_devices(type)]
+        )
+
+    @callback
+    def async_load_platforms(self, types) -> None:
+        """Set up the platforms of entity types that are not set up yet."""
+        platforms = {PLATFORM_MAPPING[type] for type in types} - self.platforms
+
+        if not platforms:
+            return
+
+        LOGGER.debug("Setting up %s for %s", ", ".join(platforms), self.username)
+
+        self.platforms.update(platforms)
+        task = self.hass.async_create_task(self._async_forward_entry_setups(platforms))
+        self._setup_tasks.add(task)
+        task.add_done_callback(self._setup_tasks.discard)
 
-        for component in SUPPORTED_PLATFORMS:
-            self.hass.async_create_task(
+    async def _async_forward_entry_setups(self, platforms) -> None:
+        """Set up platforms together."""
+        await asyncio.gather(
+            *(
                 self.hass.config_entries.async_forward_entry_setup(
-                    self.config_entry, component
+                    self.config_entry, platform
                 )
+                for platform in platforms
             )
+        )
 
-        self.client.start(self.async_update_devices_callback)
+    @callback
+    def async_create_task(self, coro) -> asyncio.Task:
+        """Run a background task that is cancelled when the account resets."""
+        task = self.hass.async_create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
 
-        return True
+        return task
+
+    async def async_reconcile(self, username: str, password: str) -> None:
+        """Replace restored devices with the cloud state.
+
+        Stored tokens are used when there are any, so a full login is only
+        needed when they are missing or can no longer be refreshed.
+        """
+        if not self.client.authenticated:
+            try:
+                await self.client.authenticate(username, password)
+            except SwitchBotCloudApiError as err:
+                LOGGER.error("Unable to authenticate %s: %s", username, err)
+
+        await self.coordinator.async_refresh()
 
     @callback
-    def async_update_devices_callback(self, devices: list) -> None:
-        """Handle update of device list."""
+    def async_save_devices_callback(self) -> None:
+        """Store the devices after a successful update."""
+        if self.coordinator.last_update_success:
+            self.store.async_delay_save(self.client.dump_state, STORAGE_SAVE_DELAY)
+
+    @callback
+    def async_devices(self, type: str) -> list:
+        """Return the known devices that provide entities of a type."""
+        return [
+            self.coordinator.data[device_id]
+            for device_id in self.devices
+            if type in DEVICE_TYPE_MAPPING[self.coordinator.data[device_id].type]
+        ]
+
+    @callback
+    def async_update_devices_callback(self) -> None:
+        """Handle update of device list.
+
+        Only devices that were added, removed or changed since the last
+        update are dispatched.
+        """
+        if not self.coordinator.data:
+            return
+
+        data = self.coordinator.data
         new_devices = {}
+        changed = []
+        removed_children = []
 
-        for device in devices:
-            device_id = device.id
+        for device_id, device in data.items():
             device_type = device.type
 
             if device_type not in DEVICE_TYPE_MAPPING:
                 continue
 
-            for type in DEVICE_TYPE_MAPPING[device_type]:
-                if device_id in self.known_ids[type]:
-                    continue
+            descriptor = _descriptor_hash(device)
+            children = {child.id for child in device.children}
+            previous = self.devices.get(device_id)
+
+            if previous is not None and previous[0] == descriptor:
+                continue
+
+            self.devices[device_id] = (descriptor, children)
 
+            if previous is not None:
+                LOGGER.debug("Found %s device changed: %s", device_type, device_id)
+                changed.append(device)
+                removed_children.extend(previous[1] - children)
+
+            for type in DEVICE_TYPE_MAPPING[device_type]:
                 LOGGER.debug(
                     "Found %s device to add %s: %s", device_type, type, device_id
                 )
@@ -111,33 +358,188 @@ class SwitchBotCloudAccount:
 
                 new_devices[type].append(device)
 
+        removed = [device_id for device_id in self.devices if device_id not in data]
+
+        for device_id in removed:
+            LOGGER.debug("Found device removed: %s", device_id)
+
+            _, children = self.devices.pop(device_id)
+
+            for known_ids in self.known_ids.values():
+                known_ids.discard(device_id)
+                known_ids.difference_update(children)
+
+        for device_id in removed_children:
+            self.known_ids[NEW_SENSOR].discard(device_id)
+
+        # Platforms set up later pick up their devices when they start.
+        if self.platforms:
+            self.async_load_platforms(new_devices)
+
         for device_type, devices in new_devices.items():
             async_dispatcher_send(
                 self.hass, self.async_signal_new_device(device_type), devices
             )
 
+        if changed or removed or removed_children:
+            self.async_update_registries(changed, removed, removed_children)
+
+    @callback
+    def async_update_registries(
+        self, changed: list, removed: list, removed_children: list
+    ) -> None:
+        """Rename changed devices and remove devices that have gone."""
+        device_registry = async_get_device_registry(self.hass)
+        entity_registry = async_get_entity_registry(self.hass)
+
+        for device in changed:
+            entry = device_registry.async_get_device({(DOMAIN, device.id)}, set())
+
+            if entry is not None and entry.name != device.name:
+                device_registry.async_update_device(entry.id, name=device.name)
+
+        for device_id in removed:
+            entry = device_registry.async_get_device({(DOMAIN, device_id)}, set())
+
+            if entry is not None:
+                device_registry.async_remove_device(entry.id)
+
+        for device_id in removed_children:
+            entity_id = entity_registry.async_get_entity_id(
+                SENSOR_DOMAIN, DOMAIN, "{}_battery_level".format(device_id)
+            )
+
+            if entity_id is not None:
+                entity_registry.async_remove(entity_id)
+
+    async def async_options_updated(self, hass, config_entry) -> None:
+        """Apply changed options."""
+        self.client.budget.set_daily_limit(self.daily_limit)
+        self.client.set_max_concurrent_commands(self.max_concurrent_commands)
+        self.executor.configure(self.executor_queue_depth, self.executor_timeout)
+        self.async_apply_deadbands()
+        self.async_apply_push()
+
+    @callback
+    def async_apply_deadbands(self) -> None:
+        """Set the dead-bands entities use to skip unchanged state writes."""
+        options = self.config_entry.options
+
+        self.coordinator.battery_deadband = options.get(
+            CONF_BATTERY_DEADBAND, DEFAULT_BATTERY_DEADBAND
+        )
+        self.coordinator.position_tolerance = options.get(
+            CONF_POSITION_TOLERANCE, DEFAULT_POSITION_TOLERANCE
+        )
+
+    @callback
+    def async_apply_push(self) -> None:
+        """Register or unregister the webhook for pushed state changes."""
+        self.client.push = self.push
+
+        if self.push and self.webhook_id is None:
+            self.webhook_id = self.config_entry.data.get(CONF_WEBHOOK_ID)
+
+            if self.webhook_id is None:
+                self.webhook_id = webhook.async_generate_id()
+                self.hass.config_entries.async_update_entry(
+                    self.config_entry,
+                    data={**self.config_entry.data, CONF_WEBHOOK_ID: self.webhook_id},
+                )
+
+            webhook.async_register(
+                self.hass,
+                DOMAIN,
+                f"{NAME} {self.username}",
+                self.webhook_id,
+                self.async_handle_webhook,
+            )
+
+            LOGGER.info(
+                "Accepting pushed state changes for %s at %s",
+                self.username,
+                webhook.async_generate_path(self.webhook_id),
+            )
+        elif not self.push and self.webhook_id is not None:
+            webhook.async_unregister(self.hass, self.webhook_id)
+            self.webhook_id = None
+
+    async def async_handle_webhook(
+        self, hass: HomeAssistant, webhook_id: str, request: web.Request
+    ) -> web.Response:
+        """Apply a state change pushed to the webhook."""
+        try:
+            event = await request.json()
+            data = self.client.apply_push(event)
+        except (ValueError, SwitchBotCloudPushError) as err:
+            LOGGER.debug("Rejecting pushed event for %s: %s", self.username, err)
+            return web.Response(status=400)
+
+        if data is not None:
+            self.coordinator.async_set_updated_data(data)
+
+        return web.Response()
+
     @callback
     def shutdown(self, event) -> None:
         """Shutdown."""
-        self.client.stop()
+        self._unsub_stop = None
+
+        if self.coordinator is not None:
+            self.engine.async_remove(self.coordinator)
 
     async def async_reset(self) -> bool:
-        """Reset this account to default state."""
-        self.client.stop()
-        self.client = None
+        """Reset this account to default state.
 
-        for component in SUPPORTED_PLATFORMS:
+        Polling stops first, then background tasks are cancelled and awaited
+        and the platforms unloaded. The last state is stored before the
+        client and its devices are released. Only what was set up is released,
+        so an account whose setup failed part way can be reset too.
+        """
+        if self._unsub_stop is not None:
+            self._unsub_stop()
+            self._unsub_stop = None
+
+        if self.coordinator is not None:
+            self.engine.async_remove(self.coordinator)
+
+        if self.webhook_id is not None:
+            webhook.async_unregister(self.hass, self.webhook_id)
+            self.webhook_id = None
+
+        tasks = list(self.tasks)
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, *self._setup_tasks, return_exceptions=True)
+
+        for platform in self.platforms:
             await self.hass.config_entries.async_forward_entry_unload(
-                self.config_entry, component
+                self.config_entry, platform
             )
 
         for unsub_dispatcher in self.listeners:
             unsub_dispatcher()
 
+        if self.client is not None:
+            if self.coordinator is not None and self.coordinator.data:
+                await self.store.async_save(self.client.dump_state())
+
+            await self.client.async_shutdown()
+
+        if self.executor is not None:
+            self.executor.shutdown()
+
+        self.coordinator = None
+        self.client = None
+        self.executor = None
+        self.platforms = set()
         self.listeners = []
+        self.devices = {}
         self.known_ids = {}
 
         for type in [NEW_COVER, NEW_SENSOR, NEW_SWITCH]:
-            self.known_ids[type] = []
+            self.known_ids[type] = set()
 
         return True
@@ -1,53 +1,882 @@
-"""Sample API Client."""
+"""SwitchBot Cloud API Client."""
 import aiohttp
 import asyncio
+import inspect
+import random
+import re
+import time
 
-from switchbot import SwitchBot
+from datetime import timedelta
+from functools import partial
+from pycognito.aws_srp import AWSSRP
 
+from .breaker import SwitchBotCloudCircuitBreaker
+from .budget import DEFAULT_DAILY_LIMIT, SwitchBotCloudRequestBudget
+from .commands import (
+    DEFAULT_MAX_CONCURRENT_COMMANDS,
+    SwitchBotCloudCommandDispatcher,
+    SwitchBotCloudCommandQueue,
+    SwitchBotCloudRequestLane,
+)
 from .const import LOGGER
+from .device import SwitchBotCloudDevice
+from .executor import SwitchBotCloudExecutor, SwitchBotCloudExecutorFull
+from .metrics import SwitchBotCloudMetrics
+from .motion import SwitchBotCloudMotionModel
+from .scheduler import PUSH_INTERVAL, SwitchBotCloudPollScheduler
+from .singleflight import SwitchBotCloudSingleFlight
+
+COGNITO_URL = "https://cognito-idp.us-east-1.amazonaws.com/"
+COGNITO_POOL_ID = "us-east-1_x1fixo5LC"
+COGNITO_CLIENT_ID = "19n6vlutv8316utiqq66urakk3"
+
+API_URLS = {
+    "query_user": "https://l9ren7efdj.execute-api.us-east-1.amazonaws.com/developStage/user/v1",
+    "get_devices": "https://l9ren7efdj.execute-api.us-east-1.amazonaws.com/developStage/sortdevices/v1/devices",
+    "refresh_device": "https://l9ren7efdj.execute-api.us-east-1.amazonaws.com/developStage/devicestatus/v1/getstatus",
+    "turn_device": "https://vxhewp40e8.execute-api.us-east-1.amazonaws.com/beta/v1/action",
+}
+
+TOKEN_EXPIRY_MARGIN = 60
+
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=15)
+MAX_RETRIES = 2
+RETRY_BACKOFF = 1.0
+
+SNAPSHOT_TTL = 2
+
+PUSH_FIELDS = {
+    "slidePosition": "position",
+    "power": "power",
+    "powerState": "power",
+    "battery": "battery",
+    "temperature": "temperature",
+    "humidity": "humidity",
+}
+
+
+class SwitchBotCloudApiError(Exception):
+    """Error talking to the SwitchBot cloud."""
+
+
+class SwitchBotCloudAuthError(SwitchBotCloudApiError):
+    """Error authenticating with the SwitchBot cloud."""
+
+
+class SwitchBotCloudBudgetError(SwitchBotCloudApiError):
+    """Request refused as the request budget is used up."""
+
+
+class SwitchBotCloudUnavailableError(SwitchBotCloudApiError):
+    """Request refused while the cloud is unavailable."""
+
+
+class SwitchBotCloudPushError(SwitchBotCloudApiError):
+    """Pushed event is not a valid state change."""
+
+
+def _process_challenge(srp: AWSSRP, challenge: dict, auth_params: dict) -> dict:
+    """Answer the password challenge with any supported pycognito version.
+
+    Before pycognito 2022.12.0 the username is only read from the challenge
+    and the request parameters are not passed.
+    """
+    challenge = {"USERNAME": auth_params["USERNAME"], **challenge}
+
+    if len(inspect.signature(srp.process_challenge).parameters) > 1:
+        return srp.process_challenge(challenge, auth_params)
+
+    return srp.process_challenge(challenge)
+
+
+def sanitize_id(dirty_id: str) -> str:
+    """Convert ID to sanitised version."""
+    return re.sub(r"[^A-F0-9]", "", dirty_id.upper())
 
 
 class SwitchBotCloudApiClient:
-    """Class to integration with SwitchBot Python library."""
+    """Class to talk to the SwitchBot cloud using the Home Assistant session."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        daily_limit: int = DEFAULT_DAILY_LIMIT,
+        max_concurrent_commands: int = DEFAULT_MAX_CONCURRENT_COMMANDS,
+        executor: SwitchBotCloudExecutor = None,
+    ) -> None:
+        """Initialize the API client."""
+        self._session = session
+
+        self._username = None
+        self._password = None
+        self._access_token = None
+        self._refresh_token = None
+        self._expires_at = 0
+        self._user_token = None
+        self._auth_lock = asyncio.Lock()
+
+        self._devices = {}
+        self._statuses = {}
+        self._queues = {}
+        self._motion = {}
+        self._pushed = {}
+        self._snapshot = {}
+
+        self.push = False
+        self.scheduler = SwitchBotCloudPollScheduler()
+        self.budget = SwitchBotCloudRequestBudget(daily_limit)
+        self.dispatcher = SwitchBotCloudCommandDispatcher(max_concurrent_commands)
+        self.lane = SwitchBotCloudRequestLane(max_concurrent_commands + 1)
+        self.metrics = SwitchBotCloudMetrics()
+        self.breaker = SwitchBotCloudCircuitBreaker()
+        self.reads = SwitchBotCloudSingleFlight()
+        self.executor = executor or SwitchBotCloudExecutor()
+
+    @property
+    def authenticated(self) -> bool:
+        """Return true if there are tokens to use."""
+        return self._refresh_token is not None
 
-    def __init__(self, session: aiohttp.ClientSession) -> None:
-        """Sample API Client."""
-        self._loop = asyncio.get_event_loop()
-        self._switchbot = None
-        self._task = None
+    @property
+    def tokens(self) -> dict:
+        """Return the current tokens for storage."""
+        return {
+            "access_token": self._access_token,
+            "refresh_token": self._refresh_token,
+            "expires_at": self._expires_at,
+            "user_token": self._user_token,
+        }
+
+    def set_max_concurrent_commands(self, limit: int) -> None:
+        """Change the number of commands that may be sent at once.
+
+        The request lane keeps a slot beyond the limit, so the commands can
+        all be sent while a poll or a token refresh is running.
+        """
+        self.dispatcher.set_limit(limit)
+        self.lane.set_slots(limit + 1)
+
+    def set_credentials(self, username: str, password: str) -> None:
+        """Set the credentials used when tokens can no longer be refreshed."""
+        self._username = username
+        self._password = password
 
     async def authenticate(self, username: str, password: str) -> None:
-        """Authenticate."""
-        assert self._switchbot is None
+        """Authenticate with a full login."""
+        self.set_credentials(username, password)
+        self._user_token = None
 
-        self._switchbot = await self._loop.run_in_executor(None, SwitchBot, username)
-        await self._loop.run_in_executor(None, self._switchbot.authenticate, password)
+        # The SRP maths is CPU bound, requests are sent through our own session.
+        srp = await self._async_run_in_executor(
+            "srp",
+            partial(
+                AWSSRP,
+                username=username,
+                password=password,
+                pool_id=COGNITO_POOL_ID,
+                client_id=COGNITO_CLIENT_ID,
+                client=self._session,
+            ),
+        )
+        auth_params = srp.get_auth_params()
 
-    def start(self, callback):
-        """Start coroutine to check devices."""
-        assert self._switchbot is not None
+        response = await self._cognito(
+            "InitiateAuth",
+            {
+                "AuthFlow": "USER_SRP_AUTH",
+                "ClientId": COGNITO_CLIENT_ID,
+                "AuthParameters": auth_params,
+            },
+        )
 
-        if self._task:
-            return
+        if response.get("ChallengeName") != AWSSRP.PASSWORD_VERIFIER_CHALLENGE:
+            raise SwitchBotCloudAuthError(
+                f"Unsupported challenge: {response.get('ChallengeName')}"
+            )
 
-        async def list_devices():
-            """Coroutine to periodically get devices."""
-            while True:
-                devices = await self._loop.run_in_executor(
-                    None, getattr, self._switchbot, "devices"
-                )
+        challenge_responses = await self._async_run_in_executor(
+            "srp",
+            partial(
+                _process_challenge, srp, response["ChallengeParameters"], auth_params
+            ),
+        )
+
+        response = await self._cognito(
+            "RespondToAuthChallenge",
+            {
+                "ClientId": COGNITO_CLIENT_ID,
+                "ChallengeName": AWSSRP.PASSWORD_VERIFIER_CHALLENGE,
+                "ChallengeResponses": challenge_responses,
+            },
+        )
+
+        self._set_tokens(response["AuthenticationResult"])
+
+    async def _async_run_in_executor(self, operation: str, func):
+        """Run a blocking function in the worker pool, recording its queue wait."""
+        queued = time.monotonic()
+
+        def run():
+            self.metrics.wait(operation, time.monotonic() - queued)
+            return func()
+
+        with self.metrics.track(operation):
+            try:
+                return await self.executor.async_run(run)
+            except SwitchBotCloudExecutorFull as err:
+                raise SwitchBotCloudApiError(f"{operation} refused: {err}") from err
+            except asyncio.TimeoutError as err:
+                raise SwitchBotCloudApiError(f"{operation} timed out") from err
+
+    async def _async_refresh_tokens(self) -> None:
+        """Refresh the access token, with a full login if that is rejected."""
+        async with self._auth_lock:
+            if not self._token_expired():
+                return
+
+            if self._refresh_token is not None:
+                try:
+                    response = await self._cognito(
+                        "InitiateAuth",
+                        {
+                            "AuthFlow": "REFRESH_TOKEN_AUTH",
+                            "ClientId": COGNITO_CLIENT_ID,
+                            "AuthParameters": {"REFRESH_TOKEN": self._refresh_token},
+                        },
+                    )
+                except SwitchBotCloudAuthError as err:
+                    LOGGER.debug("Refresh token rejected, logging in: %s", err)
+                else:
+                    self._set_tokens(response["AuthenticationResult"])
+                    return
+
+            if self._username is None:
+                raise SwitchBotCloudAuthError("No credentials to log in with")
+
+            await self.authenticate(self._username, self._password)
+
+    def _token_expired(self) -> bool:
+        """Return true if the access token has expired or is about to."""
+        return time.time() > self._expires_at - TOKEN_EXPIRY_MARGIN
+
+    def _drop_tokens(self) -> None:
+        """Forget the access and command tokens, keeping the refresh token."""
+        self._access_token = None
+        self._expires_at = 0
+        self._user_token = None
+
+    def _set_tokens(self, result: dict) -> None:
+        """Store tokens from a Cognito authentication result."""
+        self._access_token = result["AccessToken"]
+        self._expires_at = time.time() + result["ExpiresIn"]
+
+        if "RefreshToken" in result:
+            self._refresh_token = result["RefreshToken"]
+
+    async def _async_request(
+        self,
+        operation: str,
+        send,
+        retries: int = MAX_RETRIES,
+        command: bool = False,
+        queued: float = None,
+        charged: bool = True,
+    ):
+        """Send a request with a deadline, retrying failures with backoff.
+
+        Connection errors, timeouts, server errors and rate limiting (429) are
+        retried with jittered exponential backoff and count towards opening
+        the circuit breaker. Other errors mean the cloud answered and are
+        raised at once.
+        Commands are sent ahead of polls, and the time from queued to sent is
+        recorded as their wait. Charged requests take a token from the budget
+        for every attempt that is sent, retries included.
+        """
+        if not self.breaker.allow():
+            raise SwitchBotCloudUnavailableError(
+                f"{operation} refused, cloud unavailable for "
+                f"{self.breaker.retry_in():.0f}s"
+            )
+
+        if self.breaker.open:
+            retries = 0
+
+        attempt = 0
+
+        while True:
+            if charged and not self.budget.try_acquire(command=command):
+                raise SwitchBotCloudBudgetError(f"Request {operation} is over budget")
+
+            try:
+                async with self.lane.slot(command):
+                    if queued is not None and attempt == 0:
+                        self.metrics.wait(operation, time.monotonic() - queued)
+
+                    with self.metrics.track(operation):
+                        result = await send()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                if (
+                    isinstance(err, aiohttp.ClientResponseError)
+                    and err.status < 500
+                    and err.status != 429
+                ):
+                    self.breaker.success()
+
+                    if err.status == 401:
+                        raise SwitchBotCloudAuthError(
+                            f"{operation} rejected the token"
+                        ) from err
+
+                    raise SwitchBotCloudApiError(f"{operation} failed: {err}") from err
+
+                if attempt >= retries:
+                    self.breaker.failure()
+                    raise SwitchBotCloudApiError(
+                        f"{operation} failed: {err!r}"
+                    ) from err
+            except SwitchBotCloudApiError:
+                self.breaker.success()
+                raise
+            else:
+                self.breaker.success()
+                return result
+
+            attempt += 1
+            self.metrics.retry(operation)
+
+            await asyncio.sleep(
+                RETRY_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            )
+
+    async def _cognito(self, target: str, payload: dict) -> dict:
+        """Send a request to Cognito."""
+
+        async def send():
+            async with self._session.post(
+                COGNITO_URL,
+                json=payload,
+                headers={
+                    "Content-Type": "application/x-amz-json-1.1",
+                    "X-Amz-Target": f"AWSCognitoIdentityProviderService.{target}",
+                },
+                timeout=REQUEST_TIMEOUT,
+            ) as response:
+                data = await response.json(content_type=None)
+
+                if response.status >= 500:
+                    response.raise_for_status()
+
+                if response.status != 200:
+                    raise SwitchBotCloudAuthError(
+                        f"{target} failed: "
+                        f"{data.get('__type')}: {data.get('message')}"
+                    )
+
+            return data
+
+        # Logins and token refreshes hold up commands, so they share their lane.
+        # They are not SwitchBot requests and do not count towards the budget.
+        return await self._async_request(target, send, command=True, charged=False)
+
+    async def _api(
+        self,
+        method: str,
+        type: str,
+        json: dict = None,
+        queued: float = None,
+        reauth: bool = True,
+    ):
+        """Send a request to the SwitchBot API and return the body.
+
+        A rejected token is dropped and the request is sent once more with
+        fresh tokens, stored tokens may have been revoked at any time.
+        """
+        url = API_URLS[type]
+        command = type in ("query_user", "turn_device")
+
+        # Checked before tokens are refreshed, the attempts are charged as sent.
+        if self.budget.wait_time(command=command) > 0:
+            raise SwitchBotCloudBudgetError(f"Request {type} is over budget")
+
+        if type == "turn_device":
+            token = await self._async_get_user_token()
+        else:
+            if self._token_expired():
+                await self._async_refresh_tokens()
+
+            token = self._access_token
+
+        async def send():
+            async with self._session.request(
+                method,
+                url,
+                json=json,
+                headers={"Authorization": token},
+                timeout=REQUEST_TIMEOUT,
+            ) as response:
+                response.raise_for_status()
+                return await response.json(content_type=None)
+
+        # Commands are not retried, a bot in press mode would press twice. A
+        # command with a rejected token was not run, so it is sent again.
+        try:
+            data = await self._async_request(
+                type,
+                send,
+                0 if type == "turn_device" else MAX_RETRIES,
+                command,
+                queued,
+            )
+        except SwitchBotCloudAuthError:
+            if not reauth:
+                raise
+
+            LOGGER.debug("Token for %s rejected, refreshing tokens", type)
+            self._drop_tokens()
+
+            return await self._api(method, type, json, queued, False)
+
+        data = {key.lower(): value for key, value in data.items()}
+
+        if data.get("statuscode") != 100:
+            raise SwitchBotCloudApiError(
+                f"Request {type} failed with status {data.get('statuscode')}"
+            )
+
+        body = data["body"]
+        body = body["items"] if "items" in body else body
+
+        return body[0] if isinstance(body, list) and len(body) == 1 else body
+
+    async def _async_get_user_token(self) -> str:
+        """Return the token used for device commands."""
+        if self._user_token is None:
+            data = await self.reads.async_run(
+                "query_user", partial(self._api, "get", "query_user")
+            )
+            self._user_token = data["openApiToken"]["token"]
+
+        return self._user_token
+
+    async def async_get_snapshot(self) -> dict:
+        """Return the state of all devices, keyed by device ID.
+
+        Callers at the same time, or within SNAPSHOT_TTL seconds, share one
+        fetch.
+        """
+        return await self.reads.async_run(
+            "snapshot", self._async_fetch_snapshot, SNAPSHOT_TTL
+        )
+
+    async def _async_fetch_snapshot(self) -> dict:
+        """Fetch the state of all devices, keyed by device ID.
+
+        The device list and the status of each device are only fetched when
+        the scheduler says they are due, otherwise the last known values are
+        used. A curtain group and all of its members are fetched together in
+        the same request.
+        """
+        list_due = not self._devices or self.scheduler.list_due()
+        ids = self._with_group_members(self.scheduler.devices_due(self._devices))
+        count = 2 if list_due else int(bool(ids))
+
+        if count and self.budget.wait_time(count) > 0:
+            LOGGER.debug("Skipping poll, %s requests left", self.budget.remaining)
+            return self._build_snapshot()
+
+        if list_due:
+            data = await self._api("get", "get_devices")
+            devices = {}
+
+            for device in data["deviceList"]:
+                devices[sanitize_id(device["device_mac"])] = device
+
+            self._devices = devices
+            self._statuses = {
+                device_id: status
+                for device_id, status in self._statuses.items()
+                if device_id in devices
+            }
+            self.scheduler.listed(devices)
+
+            ids = self._with_group_members(self.scheduler.devices_due(self._devices))
 
-                if devices:
-                    callback(devices)
+        if ids:
+            items = await self._api("post", "refresh_device", {"items": ids})
 
-                await asyncio.sleep(60)
+            if isinstance(items, dict):
+                items = [items]
 
-        self._task = self._loop.create_task(list_devices())
+            for device_id, status in zip(ids, items):
+                device_id = sanitize_id(status.get("device_mac", device_id))
+                previous = self._statuses.get(device_id, {})
+                motion = self._motion.get(device_id)
 
-    def stop(self):
-        """End coroutine."""
-        if not self._task:
-            return
+                self._statuses[device_id] = status
 
-        self._task.cancel()
-        self._task = None
+                if motion is not None and motion.moving:
+                    position = status.get("status", {}).get("position")
+
+                    if not motion.observe(position):
+                        self.scheduler.expect(device_id, motion.arrival)
+                        continue
+
+                self._record(device_id, previous.get("status") != status.get("status"))
+
+        LOGGER.debug("Fetched status of %s devices", len(ids))
+
+        return self._build_snapshot()
+
+    def _record(self, device_id: str, changed: bool) -> None:
+        """Schedule the next status fetch of a device.
+
+        Slave curtains only report a battery level and are fetched hourly.
+        Meters only report their sensors, their changes do not call for fast
+        polls but they are fetched as often as idle devices.
+        """
+        device = self._devices.get(device_id, {})
+        device_type = device.get("device_detail", {}).get("device_type") or ""
+
+        self.scheduler.record(
+            device_id,
+            changed,
+            device.get("isMaster") is False,
+            sensor_only=device_type.startswith("WoMeter"),
+        )
+
+    def _group_members(self, device_id: str) -> list:
+        """Return the members of the group of a device, or the device alone."""
+        links = self._devices.get(device_id, {}).get("deviceLinks", [])
+
+        return [sanitize_id(link) for link in links] or [device_id]
+
+    def _with_group_members(self, ids: list) -> list:
+        """Add the other members of the groups of devices."""
+        members = {}
+
+        for device_id in ids:
+            for member in self._group_members(device_id):
+                if member in self._devices:
+                    members[member] = None
+
+        return list(members)
+
+    def dump_state(self) -> dict:
+        """Return the tokens, budget and last known devices for storage."""
+        return {
+            "tokens": self.tokens,
+            "budget": self.budget.dump_state(),
+            "devices": self._devices,
+            "statuses": self._statuses,
+        }
+
+    def restore_state(self, data: dict, fresh: bool = False) -> dict:
+        """Restore stored state and return the snapshot of the devices.
+
+        Fresh state, such as that fetched by the config flow, is not polled
+        again until it is due.
+        """
+        tokens = data.get("tokens") or {}
+
+        if tokens.get("refresh_token"):
+            self._access_token = tokens["access_token"]
+            self._refresh_token = tokens["refresh_token"]
+            self._expires_at = tokens["expires_at"]
+            self._user_token = tokens.get("user_token")
+
+        if data.get("budget"):
+            self.budget.restore_state(data["budget"])
+
+        self._devices = data["devices"]
+        self._statuses = data["statuses"]
+
+        if fresh:
+            self.scheduler.listed(self._devices)
+
+            for device_id in self._statuses:
+                self._record(device_id, False)
+
+        return self._build_snapshot()
+
+    def _build_snapshot(self) -> dict:
+        """Return the snapshot of all devices from the last known values.
+
+        Unchanged devices keep the snapshot object of the previous build.
+        """
+        snapshot = {}
+        grouped = set()
+
+        for device_id in self._devices:
+            if device_id in grouped:
+                continue
+
+            device = self._device_snapshot(device_id)
+            grouped.update(child.id for child in device.children)
+
+            if device.id in snapshot:
+                continue
+
+            previous = self._snapshot.get(device.id)
+            snapshot[device.id] = previous if previous == device else device
+
+        self._snapshot = snapshot
+
+        return snapshot
+
+    def poll_interval(self) -> timedelta:
+        """Return the delay until the next poll that fits the schedule and budget.
+
+        With push enabled polls only reconcile missed events, every
+        PUSH_INTERVAL seconds at most. While the circuit breaker is open the
+        next poll is its probe.
+        """
+        interval = max(
+            self.scheduler.next_interval(),
+            timedelta(seconds=self.budget.wait_time(2)),
+        )
+
+        if self.breaker.open:
+            return timedelta(seconds=self.breaker.retry_in())
+
+        if self.push:
+            interval = max(interval, timedelta(seconds=PUSH_INTERVAL))
+
+        return interval
+
+    def apply_push(self, event: dict) -> dict:
+        """Apply a pushed state change and return the new snapshot.
+
+        None is returned when the event is dropped, as it is for an unknown
+        device or is not newer than the last event of its device.
+        """
+        if not isinstance(event, dict) or event.get("eventType") != "changeReport":
+            raise SwitchBotCloudPushError("Not a change report")
+
+        context = event.get("context")
+
+        if not isinstance(context, dict):
+            raise SwitchBotCloudPushError("Change report without context")
+
+        sampled = context.get("timeOfSample")
+
+        if not isinstance(context.get("deviceMac"), str) or not isinstance(
+            sampled, int
+        ):
+            raise SwitchBotCloudPushError("Missing device or sample time")
+
+        device_id = sanitize_id(context["deviceMac"])
+
+        if device_id not in self._devices:
+            LOGGER.debug("Dropping event of unknown device %s", device_id)
+            return None
+
+        if sampled <= self._pushed.get(device_id, 0):
+            LOGGER.debug("Dropping stale event of %s", device_id)
+            return None
+
+        self._pushed[device_id] = sampled
+        self.reads.invalidate("snapshot")
+
+        status = dict(self._statuses.get(device_id, {}))
+        values = dict(status.get("status", {}))
+
+        for field, key in PUSH_FIELDS.items():
+            if field in context:
+                values[key] = context[field]
+
+        # Plugs report their power as "ON" or "OFF", polls read "on" or "off".
+        if isinstance(values.get("power"), str):
+            values["power"] = values["power"].lower()
+
+        status["status"] = values
+        self._statuses[device_id] = status
+
+        motion = self._motion.get(device_id)
+
+        if motion is not None and motion.moving:
+            motion.observe(values.get("position"))
+
+        self._record(device_id, False)
+
+        return self._build_snapshot()
+
+    def _device_snapshot(self, device_id: str) -> SwitchBotCloudDevice:
+        """Return the snapshot of a device, or the group it belongs to.
+
+        A group takes its ID, name and position from its master, whatever the
+        order of its links, and falls back to its first member without one.
+        """
+        links = self._devices[device_id].get("deviceLinks")
+
+        if not links:
+            return self._device_snapshot_single(device_id)
+
+        members = self._group_members(device_id)
+        children = tuple(self._device_snapshot_single(member) for member in members)
+        batteries = [child.battery for child in children if child.battery is not None]
+        master = next(
+            (
+                child
+                for member, child in zip(members, children)
+                if self._devices.get(member, {}).get("isMaster")
+            ),
+            children[0],
+        )
+
+        return master._replace(
+            type="CurtainGroup",
+            battery=min(batteries) if batteries else None,
+            children=children,
+        )
+
+    def _device_snapshot_single(self, device_id: str) -> SwitchBotCloudDevice:
+        """Return the snapshot of a single device."""
+        device = self._devices.get(device_id, {})
+        status = self._statuses.get(device_id, {})
+        values = status.get("status", {})
+        device_type = device.get("device_detail", {}).get("device_type")
+        position = None
+        state = None
+
+        if device_type == "WoHand":
+            device_type = "Bot"
+            state = status.get("deviceMode") == "1" and values.get("power") == "on"
+        elif device_type == "WoCurtain":
+            device_type = "Curtain"
+
+            if device.get("isMaster"):
+                position = values.get("position")
+
+            state = position == 0
+        elif device_type == "WoLinkMini":
+            device_type = "MiniHub"
+        elif device_type and device_type.startswith("WoMeter"):
+            device_type = "Meter"
+        elif device_type and device_type.startswith("WoPlug"):
+            device_type = "Plug"
+            state = values.get("power") == "on"
+
+        return SwitchBotCloudDevice.create(
+            device_id,
+            device_type,
+            device.get("device_name"),
+            position,
+            state,
+            values.get("battery"),
+            values.get("temperature"),
+            values.get("humidity"),
+        )
+
+    async def _async_send_command(
+        self, device_id: str, device_type: str, command: str, parameter="default"
+    ) -> None:
+        """Send a command to a device, in order with its other commands."""
+        queued = time.monotonic()
+
+        async def send():
+            await self._api(
+                "post",
+                "turn_device",
+                {
+                    "items": [
+                        {
+                            "deviceID": device_id,
+                            "deviceType": device_type,
+                            "cmdType": "command",
+                            "parameter": parameter,
+                            "deviceCmd": command,
+                        }
+                    ]
+                },
+                queued,
+            )
+
+        await self.dispatcher.async_run(device_id, send)
+
+    async def async_shutdown(self) -> None:
+        """Cancel pending commands and reads, and release all device state."""
+        for queue in self._queues.values():
+            await queue.async_cancel()
+
+        await self.reads.async_clear()
+
+        self.breaker.listener = None
+        self._queues = {}
+        self._motion = {}
+        self._pushed = {}
+        self._snapshot = {}
+        self._devices = {}
+        self._statuses = {}
+
+    def estimated_position(self, device_id: str) -> int:
+        """Return the predicted position of a moving curtain, or None."""
+        motion = self._motion.get(device_id)
+
+        if motion is None:
+            return None
+
+        return motion.estimate()
+
+    def _command_queue(self, device_id: str) -> SwitchBotCloudCommandQueue:
+        """Return the command queue of a device."""
+        if device_id not in self._queues:
+            self._queues[device_id] = SwitchBotCloudCommandQueue()
+
+        return self._queues[device_id]
+
+    async def async_move(self, device_id: str, position: int) -> None:
+        """Move a curtain or curtain group to a position.
+
+        Moves that are still queued are replaced, only the latest is sent.
+        Instead of polling while the curtain moves, its position is predicted
+        and read once at the expected arrival.
+        """
+        if device_id not in self._motion:
+            self._motion[device_id] = SwitchBotCloudMotionModel()
+
+        motion = self._motion[device_id]
+
+        async def move():
+            status = self._statuses.get(device_id, {})
+            mode = status.get("deviceMode", "0")
+            start = motion.estimate()
+
+            if start is None:
+                start = status.get("status", {}).get("position")
+
+            await self._async_send_command(
+                device_id,
+                "WoCurtain",
+                "setPosition",
+                ",".join(["0", mode, str(position)]),
+            )
+
+            motion.start(start, position)
+            self.scheduler.expect(device_id, motion.arrival)
+
+        with self.metrics.track("command_move"):
+            await self._command_queue(device_id).async_send(move)
+
+    async def async_open(self, device_id: str) -> None:
+        """Open a curtain or curtain group."""
+        await self.async_move(device_id, 0)
+
+    async def async_close(self, device_id: str) -> None:
+        """Close a curtain or curtain group."""
+        await self.async_move(device_id, 100)
+
+    async def async_turn(self, device_id: str, state: bool) -> None:
+        """Turn a bot or plug on or off, or press a bot in press mode."""
+        self.scheduler.activity(device_id)
+
+        device = self._devices.get(device_id, {})
+        device_type = device.get("device_detail", {}).get("device_type", "WoHand")
+        switch_mode = self._statuses.get(device_id, {}).get("deviceMode") == "1"
+
+        with self.metrics.track("command_turn"):
+            if device_type != "WoHand" or switch_mode:
+                await self._async_send_command(
+                    device_id, device_type, "turnOn" if state else "turnOff"
+                )
+            elif state:
+                await self._async_send_command(device_id, "WoHand", "press")
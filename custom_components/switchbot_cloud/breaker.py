@@ -0,0 +1,74 @@
+"""Circuit breaker for switchbot_cloud."""
+import time
+
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 30
+MAX_RESET_TIMEOUT = 600
+
+
+class SwitchBotCloudCircuitBreaker:
+    """Stop sending requests to a cloud that keeps failing.
+
+    The breaker opens after FAILURE_THRESHOLD failed requests in a row. While
+    open a single probe request is let through every reset timeout, which
+    doubles after each failed probe up to MAX_RESET_TIMEOUT. The first
+    successful request closes the breaker again.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a closed breaker."""
+        self._failures = 0
+        self._timeout = RESET_TIMEOUT
+        self._probe_at = None
+        self.listener = None
+
+    @property
+    def open(self) -> bool:
+        """Return true while requests are refused."""
+        return self._probe_at is not None
+
+    def retry_in(self) -> float:
+        """Return the seconds until the next probe is let through."""
+        if self._probe_at is None:
+            return 0
+
+        return max(self._probe_at - time.monotonic(), 0)
+
+    def allow(self) -> bool:
+        """Return true if a request may be sent."""
+        if self._probe_at is None:
+            return True
+
+        now = time.monotonic()
+
+        if now < self._probe_at:
+            return False
+
+        self._probe_at = now + self._timeout
+
+        return True
+
+    def success(self) -> None:
+        """Record a request the cloud answered."""
+        self._failures = 0
+        self._timeout = RESET_TIMEOUT
+
+        if self._probe_at is not None:
+            self._probe_at = None
+            self._notify()
+
+    def failure(self) -> None:
+        """Record a request that failed or timed out."""
+        self._failures += 1
+
+        if self._probe_at is not None:
+            self._timeout = min(self._timeout * 2, MAX_RESET_TIMEOUT)
+            self._probe_at = time.monotonic() + self._timeout
+        elif self._failures >= FAILURE_THRESHOLD:
+            self._probe_at = time.monotonic() + self._timeout
+            self._notify()
+
+    def _notify(self) -> None:
+        """Tell the listener that the breaker opened or closed."""
+        if self.listener is not None:
+            self.listener(not self.open)
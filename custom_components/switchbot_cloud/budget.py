@@ -0,0 +1,112 @@
+"""Cloud request budget for switchbot_cloud."""
+import time
+
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_DAILY_LIMIT = 10000
+COMMAND_RESERVE = 0.1
+
+
+def _utc_today():
+    """Return the current UTC date, the cloud quota resets at midnight UTC."""
+    return datetime.now(timezone.utc).date()
+
+
+class SwitchBotCloudRequestBudget:
+    """Token bucket shared by all requests of an account.
+
+    Tokens refill evenly so that the daily limit is spread across the day,
+    with at most an hour's worth available for bursts. Polls must leave
+    COMMAND_RESERVE of the bucket and of the daily quota for user commands.
+    """
+
+    def __init__(self, daily_limit: int = DEFAULT_DAILY_LIMIT) -> None:
+        """Initialize the budget with a full bucket."""
+        self._day = _utc_today()
+        self._updated = time.monotonic()
+        self.used = 0
+
+        self.set_daily_limit(daily_limit)
+        self._tokens = self._capacity
+
+    def set_daily_limit(self, daily_limit: int) -> None:
+        """Change the daily limit."""
+        self.daily_limit = daily_limit
+        self._rate = daily_limit / 86400
+        self._capacity = daily_limit / 24
+        self._reserve = self._capacity * COMMAND_RESERVE
+        self._daily_reserve = daily_limit * COMMAND_RESERVE
+
+    def _refill(self) -> None:
+        """Add tokens for the time passed and reset the daily count."""
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+        today = _utc_today()
+
+        if today != self._day:
+            self._day = today
+            self.used = 0
+
+    def dump_state(self) -> dict:
+        """Return the requests used today and the bucket for storage."""
+        self._refill()
+
+        return {
+            "day": self._day.isoformat(),
+            "used": self.used,
+            "tokens": self._tokens,
+            "saved_at": time.time(),
+        }
+
+    def restore_state(self, data: dict) -> None:
+        """Restore stored state, the day counts only if it is still today.
+
+        The bucket refills for the time it was stored, as it would have done.
+        """
+        self._refill()
+
+        if data.get("day") != self._day.isoformat():
+            return
+
+        self.used = max(self.used, data["used"])
+        stored = data["tokens"] + max(time.time() - data["saved_at"], 0) * self._rate
+        self._tokens = min(self._tokens, stored, self._capacity)
+
+    @property
+    def remaining(self) -> int:
+        """Return the number of requests left today."""
+        self._refill()
+
+        return max(self.daily_limit - self.used, 0)
+
+    def try_acquire(self, count: int = 1, command: bool = False) -> bool:
+        """Take tokens for requests, return false if over budget."""
+        if self.wait_time(count, command) > 0:
+            return False
+
+        self._tokens -= count
+        self.used += count
+
+        return True
+
+    def wait_time(self, count: int = 1, command: bool = False) -> float:
+        """Return the seconds until tokens for requests are available."""
+        self._refill()
+
+        if command:
+            reserve, daily_reserve = 0, 0
+        else:
+            reserve, daily_reserve = self._reserve, self._daily_reserve
+
+        if self.used + count > self.daily_limit - daily_reserve:
+            midnight = datetime.combine(
+                self._day + timedelta(days=1), datetime.min.time(), timezone.utc
+            )
+
+            return (midnight - datetime.now(timezone.utc)).total_seconds()
+
+        return max(reserve + count - self._tokens, 0) / self._rate
@@ -0,0 +1,179 @@
+"""Command queues for switchbot_cloud."""
+import asyncio
+
+from collections import deque
+from contextlib import asynccontextmanager
+
+COMMAND_DEBOUNCE = 0.5
+DEFAULT_MAX_CONCURRENT_COMMANDS = 4
+REQUEST_SLOTS = DEFAULT_MAX_CONCURRENT_COMMANDS + 1
+
+
+class SwitchBotCloudCommandQueue:
+    """Debounce and coalesce the commands of a single device.
+
+    A command that has not been sent yet is replaced by a newer one, so only
+    the latest target reaches the cloud. Every caller waiting on a replaced
+    command is resolved with the result of the request that is sent.
+    """
+
+    def __init__(self, delay: float = COMMAND_DEBOUNCE) -> None:
+        """Initialize the queue."""
+        self._delay = delay
+        self._pending = None
+        self._waiters = []
+        self._task = None
+
+    async def async_send(self, command) -> None:
+        """Queue a command coroutine function and wait until it is sent."""
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+
+        self._pending = command
+        self._waiters.append(future)
+
+        if self._task is None:
+            self._task = loop.create_task(self._async_run())
+
+        await future
+
+    async def _async_run(self) -> None:
+        """Send the latest pending command until none are left."""
+        waiters = []
+
+        try:
+            while self._pending is not None:
+                await asyncio.sleep(self._delay)
+
+                command, waiters = self._pending, self._waiters
+                self._pending, self._waiters = None, []
+
+                try:
+                    await command()
+                except Exception as err:  # pylint: disable=broad-except
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(err)
+                else:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_result(None)
+        finally:
+            self._task = None
+
+            # Callers of a command cancelled while it was sent are cancelled
+            # too, instead of waiting forever.
+            for waiter in waiters:
+                waiter.cancel()
+
+    async def async_cancel(self) -> None:
+        """Drop the pending command and wait for the queue to stop."""
+        task, waiters = self._task, self._waiters
+        self._pending, self._waiters = None, []
+
+        for waiter in waiters:
+            waiter.cancel()
+
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+class SwitchBotCloudCommandDispatcher:
+    """Run commands to different devices in parallel, up to a limit.
+
+    Commands to the same device are run one at a time in the order they were
+    sent.
+    """
+
+    def __init__(self, limit: int = DEFAULT_MAX_CONCURRENT_COMMANDS) -> None:
+        """Initialize the dispatcher."""
+        self._locks = {}
+        self.set_limit(limit)
+
+    def set_limit(self, limit: int) -> None:
+        """Change the number of commands that may run at once."""
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def async_run(self, device_id: str, command) -> None:
+        """Run a command coroutine function for a device."""
+        if device_id not in self._locks:
+            self._locks[device_id] = asyncio.Lock()
+
+        async with self._locks[device_id]:
+            async with self._semaphore:
+                await command()
+
+
+class SwitchBotCloudRequestLane:
+    """Let commands go ahead of polls for the requests of an account.
+
+    Up to the number of slots requests run at once and one slot is kept free
+    for commands, so a command never waits for polls to finish. Polls do not
+    start while a command is waiting, and waiting commands are always let in
+    before waiting polls. The client sizes the lane one above its command
+    limit, so the limit is never cut short by the lane.
+    """
+
+    def __init__(self, slots: int = REQUEST_SLOTS) -> None:
+        """Initialize the lane."""
+        self._active = 0
+        self._commands = deque()
+        self._polls = deque()
+        self.set_slots(slots)
+
+    def set_slots(self, slots: int) -> None:
+        """Change the number of requests that may run at once."""
+        self._slots = slots
+        self._wake()
+
+    def _can_start(self, command: bool) -> bool:
+        """Return true if a request of a kind may start now."""
+        if command:
+            return self._active < self._slots
+
+        return not self._commands and self._active < self._slots - 1
+
+    @asynccontextmanager
+    async def slot(self, command: bool = False):
+        """Hold a slot while sending a request."""
+        await self._async_acquire(command)
+
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._wake()
+
+    async def _async_acquire(self, command: bool) -> None:
+        """Wait for a slot, in turn with requests of the same kind."""
+        waiters = self._commands if command else self._polls
+
+        if not waiters and self._can_start(command):
+            self._active += 1
+            return
+
+        future = asyncio.get_event_loop().create_future()
+        waiters.append(future)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._active -= 1
+            else:
+                waiters.remove(future)
+
+            self._wake()
+            raise
+
+    def _wake(self) -> None:
+        """Hand free slots to waiting commands, then to waiting polls."""
+        for command, waiters in ((True, self._commands), (False, self._polls)):
+            while waiters and self._can_start(command):
+                future = waiters.popleft()
+
+                if not future.done():
+                    self._active += 1
+                    future.set_result(None)
@@ -3,10 +3,27 @@ import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.const import CONF_USERNAME, CONF_PASSWORD
-from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
-from .api import SwitchBotCloudApiClient
-from .const import DOMAIN
+from .api import SwitchBotCloudApiClient, SwitchBotCloudApiError
+from .budget import DEFAULT_DAILY_LIMIT
+from .commands import DEFAULT_MAX_CONCURRENT_COMMANDS
+from .const import (
+    CONF_BATTERY_DEADBAND,
+    CONF_DAILY_LIMIT,
+    CONF_EXECUTOR_QUEUE_DEPTH,
+    CONF_EXECUTOR_TIMEOUT,
+    CONF_MAX_CONCURRENT_COMMANDS,
+    CONF_POSITION_TOLERANCE,
+    CONF_PUSH,
+    DATA_FLOW_STATE,
+    DEFAULT_BATTERY_DEADBAND,
+    DEFAULT_POSITION_TOLERANCE,
+    DOMAIN,
+    LOGGER,
+)
+from .executor import DEFAULT_EXECUTOR_QUEUE_DEPTH, DEFAULT_EXECUTOR_TIMEOUT
 
 
 class SwitchBotCloudFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
@@ -39,6 +56,12 @@ class SwitchBotCloudFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
 
         return await self._show_config_form(user_input)
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow."""
+        return SwitchBotCloudOptionsFlowHandler(config_entry)
+
     async def _show_config_form(self, user_input):  # pylint: disable=unused-argument
         """Show the configuration form to edit location data."""
         return self.async_show_form(
@@ -50,12 +73,95 @@ class SwitchBotCloudFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         )
 
     async def _test_credentials(self, username, password):
-        """Return true if credentials is valid."""
+        """Return true if credentials is valid.
+
+        The login and the first device list are handed to the entry setup.
+        """
+        session = async_get_clientsession(self.hass)
+        client = SwitchBotCloudApiClient(session)
+
         try:
-            session = async_create_clientsession(self.hass)
-            client = SwitchBotCloudApiClient(session)
             await client.authenticate(username, password)
-            return True
         except Exception:  # pylint: disable=broad-except
-            pass
-        return False
+            return False
+        finally:
+            client.executor.shutdown()
+
+        try:
+            await client.async_get_snapshot()
+        except SwitchBotCloudApiError as err:
+            LOGGER.debug("Unable to list devices of %s: %s", username, err)
+
+        flow_state = self.hass.data.setdefault(DOMAIN, {}).setdefault(
+            DATA_FLOW_STATE, {}
+        )
+        flow_state[username] = client.dump_state()
+
+        return True
+
+
+class SwitchBotCloudOptionsFlowHandler(config_entries.OptionsFlow):
+    """Options flow for SwitchBot Cloud."""
+
+    def __init__(self, config_entry):
+        """Initialize."""
+        self.config_entry = config_entry
+        self.options = dict(config_entry.options)
+
+    async def async_step_init(self, user_input=None):
+        """Manage the options."""
+        return await self.async_step_user()
+
+    async def async_step_user(self, user_input=None):
+        """Handle a flow initialized by the user."""
+        if user_input is not None:
+            self.options.update(user_input)
+            return self.async_create_entry(
+                title=self.config_entry.data.get(CONF_USERNAME), data=self.options
+            )
+
+        return self.async_show_form(
+            step_id="user",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_DAILY_LIMIT,
+                        default=self.options.get(CONF_DAILY_LIMIT, DEFAULT_DAILY_LIMIT),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=100)),
+                    vol.Required(
+                        CONF_MAX_CONCURRENT_COMMANDS,
+                        default=self.options.get(
+                            CONF_MAX_CONCURRENT_COMMANDS,
+                            DEFAULT_MAX_CONCURRENT_COMMANDS,
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=20)),
+                    vol.Required(
+                        CONF_BATTERY_DEADBAND,
+                        default=self.options.get(
+                            CONF_BATTERY_DEADBAND, DEFAULT_BATTERY_DEADBAND
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=50)),
+                    vol.Required(
+                        CONF_POSITION_TOLERANCE,
+                        default=self.options.get(
+                            CONF_POSITION_TOLERANCE, DEFAULT_POSITION_TOLERANCE
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=20)),
+                    vol.Required(
+                        CONF_EXECUTOR_QUEUE_DEPTH,
+                        default=self.options.get(
+                            CONF_EXECUTOR_QUEUE_DEPTH, DEFAULT_EXECUTOR_QUEUE_DEPTH
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=50)),
+                    vol.Required(
+                        CONF_EXECUTOR_TIMEOUT,
+                        default=self.options.get(
+                            CONF_EXECUTOR_TIMEOUT, DEFAULT_EXECUTOR_TIMEOUT
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=5, max=300)),
+                    vol.Required(
+                        CONF_PUSH, default=self.options.get(CONF_PUSH, False)
+                    ): bool,
+                }
+            ),
+        )
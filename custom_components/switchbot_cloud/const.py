@@ -15,6 +15,26 @@ ISSUE_URL = "https://github.com/stuart-c/homeassistant-switchbot/issues"
 
 SUPPORTED_PLATFORMS = [COVER_DOMAIN, SENSOR_DOMAIN, SWITCH_DOMAIN]
 
+DATA_ENGINE = "engine"
+DATA_FLOW_STATE = "flow_state"
+
+
+STORAGE_VERSION = 1
+STORAGE_KEY = "switchbot_cloud.{}"
+STORAGE_SAVE_DELAY = 60
+
+
+CONF_DAILY_LIMIT = "daily_limit"
+CONF_MAX_CONCURRENT_COMMANDS = "max_concurrent_commands"
+CONF_BATTERY_DEADBAND = "battery_deadband"
+CONF_POSITION_TOLERANCE = "position_tolerance"
+CONF_EXECUTOR_QUEUE_DEPTH = "executor_queue_depth"
+CONF_EXECUTOR_TIMEOUT = "executor_timeout"
+CONF_PUSH = "push"
+
+DEFAULT_BATTERY_DEADBAND = 1
+DEFAULT_POSITION_TOLERANCE = 5
+
 
 NEW_COVER = "covers"
 NEW_SENSOR = "sensors"
@@ -0,0 +1,70 @@
+"""Data update coordinator for switchbot_cloud."""
+from homeassistant.core import callback, HomeAssistant
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .api import SwitchBotCloudApiClient, SwitchBotCloudApiError
+from .const import DEFAULT_BATTERY_DEADBAND, DEFAULT_POSITION_TOLERANCE, LOGGER
+from .engine import SwitchBotCloudEngine
+
+
+class SwitchBotCloudDataUpdateCoordinator(DataUpdateCoordinator):
+    """Coordinator that polls an account on the schedule of its client.
+
+    The coordinator has no timer of its own, polls are run by the engine
+    shared by all accounts.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        engine: SwitchBotCloudEngine,
+        client: SwitchBotCloudApiClient,
+        name: str,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(hass, LOGGER, name=name)
+
+        self.engine = engine
+        self.client = client
+        self.restored = False
+
+        self.client.breaker.listener = self.async_breaker_changed
+
+        self.battery_deadband = DEFAULT_BATTERY_DEADBAND
+        self.position_tolerance = DEFAULT_POSITION_TOLERANCE
+        self.suppressed_writes = 0
+
+    async def _async_update_data(self) -> dict:
+        """Fetch a snapshot of all devices."""
+        try:
+            with self.client.metrics.track("snapshot"):
+                data = await self.client.async_get_snapshot()
+        except SwitchBotCloudApiError as err:
+            raise UpdateFailed(err) from err
+        finally:
+            self.engine.async_schedule(self, self.client.poll_interval())
+
+        self.restored = False
+
+        return data
+
+    @callback
+    def async_poll_soon(self) -> None:
+        """Bring the next poll forward after a command."""
+        self.engine.async_schedule(self, self.client.poll_interval())
+
+    @callback
+    def async_breaker_changed(self, closed: bool) -> None:
+        """Mark entities unavailable as soon as the circuit breaker opens."""
+        if closed:
+            LOGGER.info("%s: cloud available again", self.name)
+            self.async_poll_soon()
+            return
+
+        LOGGER.warning("%s: cloud unavailable, pausing requests", self.name)
+
+        if self.last_update_success:
+            self.last_update_success = False
+            self.async_update_listeners()
+
+        self.async_poll_soon()
@@ -1,22 +1,23 @@
 """Cover platform for switchbot_cloud."""
 from datetime import timedelta
 from homeassistant.components.cover import (
+    CoverDeviceClass,
     CoverEntity,
-    DEVICE_CLASS_CURTAIN,
+    CoverEntityFeature,
     ENTITY_ID_FORMAT,
-    SUPPORT_CLOSE,
-    SUPPORT_OPEN,
-    SUPPORT_SET_POSITION,
 )
 from homeassistant.core import callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import async_generate_entity_id
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .account import get_account_from_config_entry
-from .const import DOMAIN, LOGGER, NAME, NEW_COVER, VERSION
+from .const import LOGGER, NEW_COVER
 
-SCAN_INTERVAL = timedelta(seconds=30)
-PARALLEL_UPDATES = 1
+PARALLEL_UPDATES = 0
+
+ESTIMATE_INTERVAL = timedelta(seconds=1)
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
@@ -32,7 +33,6 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
         for device in devices:
             device_id = device.id
             name = device.name
-            position = device.position
 
             if device_id in account.known_ids[NEW_COVER]:
                 continue
@@ -42,10 +42,12 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
             LOGGER.debug("Initialize %s", entity_id)
 
             entities.append(
-                SwitchBotCloudCover(entity_id, device_id, device, name, position)
+                SwitchBotCloudCover(
+                    account.coordinator, account.client, entity_id, device_id, name
+                )
             )
 
-            account.known_ids[NEW_COVER].append(device_id)
+            account.known_ids[NEW_COVER].add(device_id)
 
         if entities:
             async_add_entities(entities)
@@ -56,20 +58,27 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
         )
     )
 
+    async_add_cover(account.async_devices(NEW_COVER))
+
 
-class SwitchBotCloudCover(CoverEntity):
+class SwitchBotCloudCover(CoordinatorEntity, CoverEntity):
     """switchbot_cloud Cover class."""
 
-    def __init__(self, entity_id, device_id, device, name, position):
+    def __init__(self, coordinator, client, entity_id, device_id, name):
         """Initialize a sensor."""
-        super().__init__()
+        super().__init__(coordinator)
 
         self.entity_id = entity_id
-        self._device = device
+        self._client = client
 
         self._unique_id = device_id
         self._name = name
-        self._position = position
+        self._device_info = None
+        self._position = None
+        self._written = None
+        self._unsub_estimate = None
+
+        self._update_from_coordinator()
 
     @property
     def name(self):
@@ -79,12 +88,7 @@ class SwitchBotCloudCover(CoverEntity):
     @property
     def device_info(self):
         """Device info."""
-        return {
-            "identifiers": {(DOMAIN, self.unique_id)},
-            "name": self.name,
-            "manufacturer": NAME,
-            "model": VERSION,
-        }
+        return self._device_info
 
     @property
     def current_cover_position(self):
@@ -92,13 +96,27 @@ class SwitchBotCloudCover(CoverEntity):
 
         None is unknown, 0 is closed, 100 is fully open.
         """
+        if self._position is None:
+            return None
+
         return 100 - self._position
 
     @property
     def is_closed(self):
         """Return if the cover is closed or not."""
+        if self._position is None:
+            return None
+
         return self._position == 100
 
+    @property
+    def extra_state_attributes(self):
+        """Return the state attributes, marking state restored from storage."""
+        if self.coordinator.restored:
+            return {"restored": True}
+
+        return None
+
     @property
     def unique_id(self):
         """Return a unique ID."""
@@ -107,47 +125,126 @@ class SwitchBotCloudCover(CoverEntity):
     @property
     def device_class(self):
         """Return the class of the sensor."""
-        return DEVICE_CLASS_CURTAIN
+        return CoverDeviceClass.CURTAIN
 
     @property
     def supported_features(self):
         """Flag supported features."""
-        supported_features = SUPPORT_OPEN | SUPPORT_CLOSE | SUPPORT_SET_POSITION
+        supported_features = (
+            CoverEntityFeature.OPEN
+            | CoverEntityFeature.CLOSE
+            | CoverEntityFeature.SET_POSITION
+        )
 
         return supported_features
 
-    async def async_update(self):
-        """Update the sensor state."""
-        self._name = await self.hass.async_add_executor_job(
-            getattr, self._device, "name"
-        )
-        position = await self.hass.async_add_executor_job(
-            getattr, self._device, "position"
-        )
+    @callback
+    def _update_from_coordinator(self):
+        """Update the state from the latest snapshot, or the estimate of a move."""
+        device = self.coordinator.data.get(self._unique_id)
+
+        if device is None:
+            return
+
+        self._name = device.name
+        self._device_info = device.device_info
+
+        # The last read is from before the move, the estimate is newer.
+        estimate = self._client.estimated_position(self._unique_id)
+
+        if estimate is not None:
+            self._position = estimate
+            return
+
+        position = device.position
+
+        if position is None:
+            return
+
+        tolerance = self.coordinator.position_tolerance
 
-        if position >= 95:
+        if position >= 100 - tolerance:
             position = 100
-        if position <= 5:
+        elif position <= tolerance:
             position = 0
+        elif self._position is not None and abs(position - self._position) < tolerance:
+            return
 
         self._position = position
 
         LOGGER.debug("Update cover state: %s = %s", self.entity_id, self._position)
 
+    @callback
+    def _handle_coordinator_update(self):
+        """Handle updated data from the coordinator, writing only changes."""
+        self._update_from_coordinator()
+        self._async_write_changed_state()
+
+    @callback
+    def _async_write_changed_state(self):
+        """Write the state unless it is the state written last."""
+        written = (
+            self._name,
+            self._position,
+            self.available,
+            self.coordinator.restored,
+        )
+
+        if written == self._written:
+            self.coordinator.suppressed_writes += 1
+            return
+
+        self._written = written
+        self.async_write_ha_state()
+
+    @callback
+    def _async_start_estimate(self):
+        """Publish the predicted position while the cover moves."""
+        if self._unsub_estimate is None:
+            self._unsub_estimate = async_track_time_interval(
+                self.hass, self._async_update_estimate, ESTIMATE_INTERVAL
+            )
+
+        self._async_update_estimate()
+
+    @callback
+    def _async_update_estimate(self, now=None):
+        """Update the position from the motion model."""
+        position = self._client.estimated_position(self._unique_id)
+
+        if position is None:
+            self._async_stop_estimate()
+            return
+
+        self._position = position
+        self._async_write_changed_state()
+
+    @callback
+    def _async_stop_estimate(self):
+        """Stop publishing the predicted position."""
+        if self._unsub_estimate is not None:
+            self._unsub_estimate()
+            self._unsub_estimate = None
+
+    async def async_will_remove_from_hass(self):
+        """Stop publishing the predicted position when removed."""
+        await super().async_will_remove_from_hass()
+        self._async_stop_estimate()
+
     async def async_open_cover(self):
         """Open the cover."""
-        await self.hass.async_add_executor_job(self._device.open)
-        self._position = 0
-        self.async_schedule_update_ha_state()
+        await self._client.async_open(self._unique_id)
+        self.coordinator.async_poll_soon()
+        self._async_start_estimate()
 
     async def async_close_cover(self):
         """Close cover."""
-        await self.hass.async_add_executor_job(self._device.close)
-        self._position = 100
-        self.async_schedule_update_ha_state()
+        await self._client.async_close(self._unique_id)
+        self.coordinator.async_poll_soon()
+        self._async_start_estimate()
 
     async def async_set_cover_position(self, position):
         """Move the cover to a specific position."""
-        await self.hass.async_add_executor_job(self._device.move, 100 - position)
-        self._position = 100 - position
-        self.async_schedule_update_ha_state()
+        await self._client.async_move(self._unique_id, 100 - position)
+        self.coordinator.async_poll_soon()
+        self._async_start_estimate()
@@ -0,0 +1,55 @@
+"""Device snapshots for switchbot_cloud."""
+from typing import NamedTuple, Optional, Tuple
+
+from .const import DOMAIN, NAME, VERSION
+
+
+class SwitchBotCloudDevice(NamedTuple):
+    """Immutable snapshot of a device, shared by all of its entities.
+
+    A snapshot is only replaced when a value changes, so entities of an
+    unchanged device keep reading the same object.
+    """
+
+    id: str
+    type: str
+    name: str
+    position: Optional[int]
+    state: Optional[bool]
+    battery: Optional[int]
+    temperature: Optional[float]
+    humidity: Optional[int]
+    children: Tuple["SwitchBotCloudDevice", ...]
+    device_info: dict
+
+    @classmethod
+    def create(
+        cls,
+        device_id: str,
+        device_type: str,
+        name: str,
+        position: int = None,
+        state: bool = None,
+        battery: int = None,
+        temperature: float = None,
+        humidity: int = None,
+        children: tuple = (),
+    ) -> "SwitchBotCloudDevice":
+        """Return a snapshot with the registry info of the device."""
+        return cls(
+            device_id,
+            device_type,
+            name,
+            position,
+            state,
+            battery,
+            temperature,
+            humidity,
+            children,
+            {
+                "identifiers": {(DOMAIN, device_id)},
+                "name": name,
+                "manufacturer": NAME,
+                "model": VERSION,
+            },
+        )
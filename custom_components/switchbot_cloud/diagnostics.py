@@ -0,0 +1,29 @@
+"""Diagnostics support for switchbot_cloud."""
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .account import get_account_from_config_entry
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> dict:
+    """Return diagnostics for a config entry."""
+    account = get_account_from_config_entry(hass, config_entry)
+    client = account.client
+    coordinator = account.coordinator
+
+    return {
+        "devices": len(account.devices),
+        "last_update_success": coordinator.last_update_success,
+        "next_poll": coordinator.engine.next_poll(coordinator),
+        "suppressed_writes": coordinator.suppressed_writes,
+        "push": client.push,
+        "cloud_available": not client.breaker.open,
+        "budget": {
+            "daily_limit": client.budget.daily_limit,
+            "used": client.budget.used,
+            "remaining": client.budget.remaining,
+        },
+        "operations": client.metrics.as_dict(),
+    }
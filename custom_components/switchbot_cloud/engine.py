@@ -0,0 +1,151 @@
+"""Shared polling engine for switchbot_cloud."""
+import asyncio
+import time
+
+from datetime import timedelta
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import callback, HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_call_later
+
+from .const import LOGGER
+
+MAX_CONCURRENT_POLLS = 2
+
+
+class SwitchBotCloudEngine:
+    """Poll every account from one timer over one connection pool.
+
+    Each account asks for its next poll through its coordinator. Polls that
+    are due start the most overdue first, and no more than the limit run at
+    once, so a slow account cannot hold up the others, a busy account cannot
+    starve them and the requests of many accounts do not burst together.
+    Tokens, budgets and devices stay with each account.
+    """
+
+    def __init__(self, hass: HomeAssistant, limit: int = MAX_CONCURRENT_POLLS) -> None:
+        """Initialize the engine."""
+        self.hass = hass
+        self.session = async_get_clientsession(hass)
+
+        self._limit = limit
+        self._due = {}
+        self._polls = {}
+        self._unsub_timer = None
+        self._unsub_stop = hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, self.async_stop
+        )
+
+    @property
+    def coordinators(self) -> list:
+        """Return the coordinators of all accounts."""
+        return list(self._due)
+
+    def next_poll(self, coordinator) -> float:
+        """Return the seconds until the next poll of an account, or None."""
+        due = self._due.get(coordinator)
+
+        if due is None:
+            return None
+
+        return max(due - time.monotonic(), 0)
+
+    @callback
+    def async_add(self, coordinator) -> None:
+        """Start polling an account once it schedules its first poll."""
+        self._due[coordinator] = None
+
+    @callback
+    def async_remove(self, coordinator) -> None:
+        """Stop polling an account, cancelling its poll if one is running."""
+        self._due.pop(coordinator, None)
+        task = self._polls.pop(coordinator, None)
+
+        if task is not None:
+            task.cancel()
+
+    @callback
+    def async_schedule(self, coordinator, delay: timedelta) -> None:
+        """Schedule the next poll of an account."""
+        if coordinator not in self._due:
+            return
+
+        self._due[coordinator] = time.monotonic() + delay.total_seconds()
+        self._async_arm()
+
+    @callback
+    def _async_arm(self) -> None:
+        """Set the timer for the earliest due poll, if one may start."""
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+
+        if len(self._polls) >= self._limit:
+            return
+
+        due = [
+            at
+            for coordinator, at in self._due.items()
+            if at is not None and coordinator not in self._polls
+        ]
+
+        if not due:
+            return
+
+        self._unsub_timer = async_call_later(
+            self.hass, max(min(due) - time.monotonic(), 0), self._async_fire
+        )
+
+    @callback
+    def _async_fire(self, now) -> None:
+        """Start the polls that are due, the most overdue first."""
+        self._unsub_timer = None
+        now = time.monotonic()
+        due = sorted(
+            (
+                (at, coordinator)
+                for coordinator, at in self._due.items()
+                if at is not None and at <= now and coordinator not in self._polls
+            ),
+            key=lambda item: item[0],
+        )
+
+        for _, coordinator in due[: self._limit - len(self._polls)]:
+            self._due[coordinator] = None
+
+            LOGGER.debug("Polling %s", coordinator.name)
+
+            self._polls[coordinator] = self.hass.async_create_task(
+                self._async_poll(coordinator)
+            )
+
+        self._async_arm()
+
+    async def _async_poll(self, coordinator) -> None:
+        """Poll an account, then start the next due poll."""
+        try:
+            await coordinator.async_refresh()
+        finally:
+            if self._polls.get(coordinator) is asyncio.current_task():
+                del self._polls[coordinator]
+
+            self._async_arm()
+
+    @callback
+    def async_stop(self, event=None) -> None:
+        """Stop polling all accounts."""
+        if event is not None:
+            self._unsub_stop = None
+        elif self._unsub_stop is not None:
+            self._unsub_stop()
+            self._unsub_stop = None
+
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+
+        for task in self._polls.values():
+            task.cancel()
+
+        self._due = {}
+        self._polls = {}
@@ -0,0 +1,68 @@
+"""Worker pool for blocking calls of switchbot_cloud."""
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+
+EXECUTOR_WORKERS = 2
+DEFAULT_EXECUTOR_QUEUE_DEPTH = 4
+DEFAULT_EXECUTOR_TIMEOUT = 30
+
+
+class SwitchBotCloudExecutorFull(Exception):
+    """Call refused as the worker pool is full."""
+
+
+class SwitchBotCloudExecutor:
+    """Small worker pool owned by an account.
+
+    Blocking calls run here instead of the shared Home Assistant executor, so
+    a slow cloud cannot take threads from other integrations. Calls beyond
+    the workers and queue depth are refused straight away. A call that times
+    out keeps its slot until its thread finishes.
+    """
+
+    def __init__(
+        self,
+        queue_depth: int = DEFAULT_EXECUTOR_QUEUE_DEPTH,
+        timeout: float = DEFAULT_EXECUTOR_TIMEOUT,
+    ) -> None:
+        """Initialize the pool, threads are started on demand."""
+        self._pool = ThreadPoolExecutor(
+            max_workers=EXECUTOR_WORKERS, thread_name_prefix="switchbot_cloud"
+        )
+        self._pending = 0
+
+        self.configure(queue_depth, timeout)
+
+    def configure(self, queue_depth: int, timeout: float) -> None:
+        """Change the queue depth and the timeout of calls."""
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+
+    @property
+    def pending(self) -> int:
+        """Return the number of calls running or queued."""
+        return self._pending
+
+    async def async_run(self, func):
+        """Run a blocking function and return its result."""
+        if self._pending >= EXECUTOR_WORKERS + self.queue_depth:
+            raise SwitchBotCloudExecutorFull(f"{self._pending} calls pending")
+
+        loop = asyncio.get_event_loop()
+        future = self._pool.submit(func)
+
+        self._pending += 1
+        future.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(self._async_release)
+        )
+
+        return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+
+    def _async_release(self) -> None:
+        """Free the slot of a finished call."""
+        self._pending -= 1
+
+    def shutdown(self) -> None:
+        """Stop the pool without waiting for running calls."""
+        self._pool.shutdown(wait=False)
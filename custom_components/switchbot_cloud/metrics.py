@@ -0,0 +1,113 @@
+"""Request instrumentation for switchbot_cloud."""
+import time
+
+from collections import deque
+from contextlib import contextmanager
+
+SAMPLE_SIZE = 500
+
+
+def _percentile(samples: list, percent: int) -> float:
+    """Return a percentile of sorted samples, in milliseconds."""
+    if not samples:
+        return None
+
+    index = min(len(samples) - 1, int(len(samples) * percent / 100))
+
+    return round(samples[index] * 1000, 1)
+
+
+class _OperationStats:
+    """Counters and recent latencies of one operation."""
+
+    __slots__ = ("count", "errors", "retries", "latencies", "waits")
+
+    def __init__(self) -> None:
+        """Initialize empty stats."""
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies = deque(maxlen=SAMPLE_SIZE)
+        self.waits = deque(maxlen=SAMPLE_SIZE)
+
+    def as_dict(self) -> dict:
+        """Return the stats with latency percentiles."""
+        latencies = sorted(self.latencies)
+        waits = sorted(self.waits)
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "retries": self.retries,
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95),
+            "p99_ms": _percentile(latencies, 99),
+            "wait_p95_ms": _percentile(waits, 95),
+        }
+
+
+class SwitchBotCloudMetrics:
+    """Per-operation counters and latency percentiles of an account.
+
+    Latency percentiles are taken over the last SAMPLE_SIZE calls of each
+    operation.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self._operations = {}
+
+    def _stats(self, operation: str) -> _OperationStats:
+        """Return the stats of an operation, creating them if needed."""
+        if operation not in self._operations:
+            self._operations[operation] = _OperationStats()
+
+        return self._operations[operation]
+
+    @contextmanager
+    def track(self, operation: str):
+        """Time the block as a call of an operation, counting errors."""
+        stats = self._stats(operation)
+        start = time.monotonic()
+
+        try:
+            yield
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.count += 1
+            stats.latencies.append(time.monotonic() - start)
+
+    def retry(self, operation: str) -> None:
+        """Count a retry of an operation."""
+        self._stats(operation).retries += 1
+
+    def wait(self, operation: str, seconds: float) -> None:
+        """Record time an operation spent queued before it started."""
+        self._stats(operation).waits.append(seconds)
+
+    @property
+    def errors(self) -> int:
+        """Return the number of failed calls of all operations."""
+        return sum(stats.errors for stats in self._operations.values())
+
+    def percentile(self, percent: int) -> float:
+        """Return a latency percentile over all operations, in milliseconds."""
+        latencies = []
+
+        for stats in self._operations.values():
+            latencies.extend(stats.latencies)
+
+        return _percentile(sorted(latencies), percent)
+
+    def wait_percentile(self, operation: str, percent: int) -> float:
+        """Return a queue wait percentile of an operation, in milliseconds."""
+        return _percentile(sorted(self._stats(operation).waits), percent)
+
+    def as_dict(self) -> dict:
+        """Return the stats of every operation."""
+        return {
+            operation: stats.as_dict()
+            for operation, stats in sorted(self._operations.items())
+        }
@@ -0,0 +1,114 @@
+"""Cover motion model for switchbot_cloud."""
+import time
+
+DEFAULT_SPEED = 5.0
+MIN_SPEED = 0.5
+START_DELAY = 2.0
+ARRIVAL_TOLERANCE = 2
+SPEED_SMOOTHING = 0.5
+SPEED_PROBE = 1.1
+
+
+class SwitchBotCloudMotionModel:
+    """Learn the travel speed of a curtain and predict its position.
+
+    Speed is in percent per second. A move is confirmed by reading the
+    position at the predicted arrival time. A curtain still short of its
+    target gives a measured speed that is blended into the estimate. A
+    curtain already there only shows the estimate was not too fast, so the
+    estimate is nudged up to keep the prediction tight. A curtain that has
+    not moved yet is read again at the arrival. A curtain that has made no
+    progress since the last read by the arrival, or that moves away from the
+    target, was stopped and ends the move where it was read.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the model with a typical speed."""
+        self.speed = DEFAULT_SPEED
+        self._start = None
+        self._target = None
+        self._started = None
+        self._last = None
+
+    @property
+    def moving(self) -> bool:
+        """Return true while a move is unconfirmed."""
+        return self._target is not None
+
+    @property
+    def target(self) -> int:
+        """Return the target of the current move."""
+        return self._target
+
+    @property
+    def arrival(self) -> float:
+        """Return the predicted monotonic time the move completes."""
+        distance = abs(self._target - self._start)
+
+        return self._started + START_DELAY + distance / self.speed
+
+    def start(self, position: int, target: int, now: float = None) -> None:
+        """Start a move from a position to a target."""
+        self._start = target if position is None else position
+        self._target = target
+        self._started = time.monotonic() if now is None else now
+        self._last = self._start
+
+    def estimate(self, now: float = None) -> int:
+        """Return the interpolated position of the current move."""
+        if not self.moving:
+            return None
+
+        now = time.monotonic() if now is None else now
+        travelled = max(now - self._started - START_DELAY, 0) * self.speed
+        distance = abs(self._target - self._start)
+
+        if travelled >= distance:
+            return self._target
+
+        if self._target > self._start:
+            return round(self._start + travelled)
+
+        return round(self._start - travelled)
+
+    def observe(self, position: int, now: float = None) -> bool:
+        """Learn from a position read, return true once the move is done."""
+        if not self.moving or position is None:
+            return True
+
+        now = time.monotonic() if now is None else now
+
+        if abs(position - self._target) <= ARRIVAL_TOLERANCE:
+            self.speed *= SPEED_PROBE
+            self._target = None
+            return True
+
+        remaining = abs(self._target - position)
+        previous = abs(self._target - self._last)
+
+        if remaining > previous + ARRIVAL_TOLERANCE:
+            # Stopped and sent back, by the app or a button on the curtain.
+            self._target = None
+            return True
+
+        if remaining >= previous:
+            # A poll can read the curtain before it starts to move, polls are
+            # brought forward and the cloud answers late. Only a curtain with
+            # no progress by the predicted arrival has stopped short, and it
+            # tells nothing about the speed.
+            if now < self.arrival:
+                return False
+
+            self._target = None
+            return True
+
+        self._last = position
+        elapsed = now - self._started - START_DELAY
+
+        if elapsed <= 0:
+            return False
+
+        measured = max(abs(position - self._start) / elapsed, MIN_SPEED)
+        self.speed += (measured - self.speed) * SPEED_SMOOTHING
+
+        return False
@@ -0,0 +1,134 @@
+"""Adaptive poll scheduler for switchbot_cloud."""
+import random
+import time
+
+from datetime import timedelta
+
+FAST_INTERVAL = 5
+ACTIVE_WINDOW = 60
+BASE_INTERVAL = 30
+MAX_INTERVAL = 300
+BATTERY_INTERVAL = 3600
+LIST_INTERVAL = 600
+PUSH_INTERVAL = 900
+JITTER = 0.1
+
+
+class _DeviceSchedule:
+    """Poll state of a single device."""
+
+    __slots__ = ("next_poll", "interval", "active_until")
+
+    def __init__(self, now: float) -> None:
+        """Initialize a device that is due immediately."""
+        self.next_poll = now
+        self.interval = BASE_INTERVAL
+        self.active_until = 0
+
+
+class SwitchBotCloudPollScheduler:
+    """Decide which devices to poll and when to poll next.
+
+    Devices are polled every FAST_INTERVAL seconds for ACTIVE_WINDOW seconds
+    after a command or an observed change. Idle devices back off exponentially
+    from BASE_INTERVAL to MAX_INTERVAL. Changes of sensor-only devices, such
+    as meters, do not call for fast polls, so they always back off like idle
+    devices. Devices that only report a battery level, such as the slaves of
+    curtain groups, are polled every BATTERY_INTERVAL.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the scheduler."""
+        self._devices = {}
+        self._next_list = 0
+
+    def _schedule(self, device_id: str, now: float) -> _DeviceSchedule:
+        """Return the schedule of a device, creating it if needed."""
+        if device_id not in self._devices:
+            self._devices[device_id] = _DeviceSchedule(now)
+
+        return self._devices[device_id]
+
+    def list_due(self, now: float = None) -> bool:
+        """Return true if the device list should be fetched."""
+        now = time.monotonic() if now is None else now
+
+        return now >= self._next_list
+
+    def listed(self, device_ids, now: float = None) -> None:
+        """Record a fetch of the device list and forget removed devices."""
+        now = time.monotonic() if now is None else now
+        self._next_list = now + LIST_INTERVAL
+
+        for device_id in set(self._devices) - set(device_ids):
+            del self._devices[device_id]
+
+    def devices_due(self, device_ids, now: float = None) -> list:
+        """Return the devices whose status should be fetched now.
+
+        Devices due within FAST_INTERVAL are included as they share the
+        same batch request.
+        """
+        now = time.monotonic() if now is None else now
+
+        return [
+            device_id
+            for device_id in device_ids
+            if self._schedule(device_id, now).next_poll <= now + FAST_INTERVAL
+        ]
+
+    def activity(self, device_id: str, now: float = None) -> None:
+        """Poll a device quickly after a command or change."""
+        now = time.monotonic() if now is None else now
+        schedule = self._schedule(device_id, now)
+
+        schedule.active_until = now + ACTIVE_WINDOW
+        schedule.interval = FAST_INTERVAL
+        schedule.next_poll = now + FAST_INTERVAL
+
+    def expect(self, device_id: str, at: float) -> None:
+        """Poll a device once at an expected time, such as a predicted arrival."""
+        schedule = self._schedule(device_id, at)
+
+        schedule.active_until = 0
+        schedule.next_poll = at
+
+    def record(
+        self,
+        device_id: str,
+        changed: bool,
+        battery_only: bool,
+        now: float = None,
+        sensor_only: bool = False,
+    ) -> None:
+        """Record a status fetch and schedule the next one."""
+        now = time.monotonic() if now is None else now
+        schedule = self._schedule(device_id, now)
+
+        if changed and not battery_only and not sensor_only:
+            self.activity(device_id, now)
+            return
+
+        if battery_only:
+            schedule.interval = BATTERY_INTERVAL
+        elif now < schedule.active_until:
+            schedule.interval = FAST_INTERVAL
+        else:
+            schedule.interval = min(
+                max(schedule.interval * 2, BASE_INTERVAL), MAX_INTERVAL
+            )
+
+        schedule.next_poll = now + schedule.interval
+
+    def next_interval(self, now: float = None) -> timedelta:
+        """Return the jittered delay until the next poll."""
+        now = time.monotonic() if now is None else now
+        next_poll = self._next_list
+
+        for schedule in self._devices.values():
+            next_poll = min(next_poll, schedule.next_poll)
+
+        delay = max(next_poll - now, FAST_INTERVAL)
+        delay *= random.uniform(1 - JITTER, 1 + JITTER)
+
+        return timedelta(seconds=delay)
@@ -1,17 +1,31 @@
 """Sensor platform for switchbot_cloud."""
-from datetime import timedelta
-from homeassistant.components.sensor import ENTITY_ID_FORMAT
-from homeassistant.const import DEVICE_CLASS_BATTERY, PERCENTAGE
+from homeassistant.components.sensor import ENTITY_ID_FORMAT, SensorDeviceClass
+from homeassistant.const import PERCENTAGE, TEMP_CELSIUS
 from homeassistant.core import callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
-from homeassistant.helpers.entity import async_generate_entity_id, Entity
+from homeassistant.helpers.entity import (
+    async_generate_entity_id,
+    Entity,
+    EntityCategory,
+)
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .account import get_account_from_config_entry
-from .const import DOMAIN, LOGGER, NAME, NEW_SENSOR, VERSION
+from .const import LOGGER, NEW_SENSOR
 
-SCAN_INTERVAL = timedelta(minutes=5)
 PARALLEL_UPDATES = 1
 
+METRIC_SENSORS = {
+    "latency": "cloud latency",
+    "errors": "cloud errors",
+    "command_latency": "command latency",
+}
+
+METER_SENSORS = {
+    "temperature": (SensorDeviceClass.TEMPERATURE, TEMP_CELSIUS),
+    "humidity": (SensorDeviceClass.HUMIDITY, PERCENTAGE),
+}
+
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up a sensors for SwitchBot Cloud."""
@@ -25,7 +39,6 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 
         for parent_device in devices:
             parent_id = parent_device.id
-            parent_name = parent_device.name
             children = parent_device.children
 
             if not children:
@@ -34,7 +47,6 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
             for device in children:
                 device_id = device.id
                 name = device.name
-                battery = device.battery
 
                 if device_id in account.known_ids[NEW_SENSOR]:
                     continue
@@ -47,18 +59,33 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
 
                 entities.append(
                     SwitchBotCloudBatterySensor(
-                        entity_id,
-                        device_id,
-                        device,
-                        name,
-                        parent_id,
-                        parent_device,
-                        parent_name,
-                        battery,
+                        account.coordinator, entity_id, device_id, name, parent_id
                     )
                 )
 
-                account.known_ids[NEW_SENSOR].append(device_id)
+                account.known_ids[NEW_SENSOR].add(device_id)
+
+            if parent_device.type != "Meter":
+                continue
+
+            for kind in METER_SENSORS:
+                sensor_id = "{}_{}".format(parent_id, kind)
+
+                if sensor_id in account.known_ids[NEW_SENSOR]:
+                    continue
+
+                name = "{} {}".format(parent_device.name, kind)
+                entity_id = async_generate_entity_id(ENTITY_ID_FORMAT, name, hass=hass)
+
+                LOGGER.debug("Initialize %s", entity_id)
+
+                entities.append(
+                    SwitchBotCloudMeterSensor(
+                        account.coordinator, entity_id, parent_id, name, kind
+                    )
+                )
+
+                account.known_ids[NEW_SENSOR].add(sensor_id)
 
         if entities:
             async_add_entities(entities)
@@ -69,34 +96,54 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
         )
     )
 
+    async_add_sensor(account.async_devices(NEW_SENSOR))
+
+    name = "{} remaining requests".format(account.username)
+    entity_id = async_generate_entity_id(ENTITY_ID_FORMAT, name, hass=hass)
+
+    entities = [
+        SwitchBotCloudRemainingRequestsSensor(
+            account.coordinator, entity_id, account.id, name, account.client.budget
+        )
+    ]
+
+    for metric, description in METRIC_SENSORS.items():
+        name = "{} {}".format(account.username, description)
+        entity_id = async_generate_entity_id(ENTITY_ID_FORMAT, name, hass=hass)
+
+        entities.append(
+            SwitchBotCloudMetricSensor(
+                account.coordinator,
+                entity_id,
+                account.id,
+                name,
+                account.client.metrics,
+                metric,
+            )
+        )
+
+    async_add_entities(entities)
+
 
-class SwitchBotCloudBatterySensor(Entity):
+class SwitchBotCloudBatterySensor(CoordinatorEntity, Entity):
     """A battery sensor implementation for SwitchBot Cloud."""
 
-    def __init__(
-        self,
-        entity_id,
-        device_id,
-        device,
-        name,
-        parent_id,
-        parent_device,
-        parent_name,
-        battery,
-    ):
+    def __init__(self, coordinator, entity_id, device_id, name, parent_id):
         """Initialize a sensor."""
-        super().__init__()
+        super().__init__(coordinator)
 
         self.entity_id = entity_id
-        self._device = device
 
+        self._device_id = device_id
         self._unique_id = "{}_battery_level".format(device_id)
         self._name = name
-        self._battery = battery
+        self._battery = None
+        self._written = None
 
-        self._parent = parent_device
         self._parent_id = parent_id
-        self._parent_name = parent_name
+        self._parent_device_info = None
+
+        self._update_from_coordinator()
 
     @property
     def name(self):
@@ -106,18 +153,21 @@ class SwitchBotCloudBatterySensor(Entity):
     @property
     def device_info(self):
         """Device info."""
-        return {
-            "identifiers": {(DOMAIN, self._parent_id)},
-            "name": self._parent_name,
-            "manufacturer": NAME,
-            "model": VERSION,
-        }
+        return self._parent_device_info
 
     @property
     def state(self):
         """Return the state of the sensor."""
         return self._battery
 
+    @property
+    def extra_state_attributes(self):
+        """Return the state attributes, marking state restored from storage."""
+        if self.coordinator.restored:
+            return {"restored": True}
+
+        return None
+
     @property
     def unique_id(self):
         """Return a unique ID."""
@@ -126,26 +176,246 @@ class SwitchBotCloudBatterySensor(Entity):
     @property
     def device_class(self):
         """Return the class of the sensor."""
-        return DEVICE_CLASS_BATTERY
+        return SensorDeviceClass.BATTERY
 
     @property
     def unit_of_measurement(self):
         """Return the units of measurement."""
         return PERCENTAGE
 
-    async def async_update(self):
-        """Update the sensor state."""
-        self._name = await self.hass.async_add_executor_job(
-            getattr, self._device, "name"
-        )
-        self._battery = await self.hass.async_add_executor_job(
-            getattr, self._device, "battery"
-        )
+    @callback
+    def _update_from_coordinator(self):
+        """Update the state from the latest coordinator snapshot."""
+        parent = self.coordinator.data.get(self._parent_id)
 
-        self._parent_name = await self.hass.async_add_executor_job(
-            getattr, self._parent, "name"
-        )
+        if parent is None:
+            return
+
+        self._parent_device_info = parent.device_info
+
+        for device in parent.children or (parent,):
+            if device.id != self._device_id:
+                continue
+
+            self._name = device.name
+            battery = device.battery
+
+            if (
+                battery is None
+                or self._battery is None
+                or abs(battery - self._battery) >= self.coordinator.battery_deadband
+            ):
+                self._battery = battery
 
         LOGGER.debug(
             "Update battery sensor state: %s = %s", self.entity_id, self._battery
         )
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Handle updated data from the coordinator, writing only changes."""
+        self._update_from_coordinator()
+
+        written = (
+            self._name,
+            self._battery,
+            self._parent_device_info,
+            self.available,
+            self.coordinator.restored,
+        )
+
+        if written == self._written:
+            self.coordinator.suppressed_writes += 1
+            return
+
+        self._written = written
+        self.async_write_ha_state()
+
+
+class SwitchBotCloudMeterSensor(CoordinatorEntity, Entity):
+    """A temperature or humidity sensor of a SwitchBot meter."""
+
+    def __init__(self, coordinator, entity_id, device_id, name, kind):
+        """Initialize a sensor."""
+        super().__init__(coordinator)
+
+        self.entity_id = entity_id
+
+        self._device_id = device_id
+        self._unique_id = "{}_{}".format(device_id, kind)
+        self._name = name
+        self._kind = kind
+        self._value = None
+        self._device_info = None
+        self._written = None
+
+        self._update_from_coordinator()
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return self._name
+
+    @property
+    def device_info(self):
+        """Device info."""
+        return self._device_info
+
+    @property
+    def state(self):
+        """Return the state of the sensor."""
+        return self._value
+
+    @property
+    def extra_state_attributes(self):
+        """Return the state attributes, marking state restored from storage."""
+        if self.coordinator.restored:
+            return {"restored": True}
+
+        return None
+
+    @property
+    def unique_id(self):
+        """Return a unique ID."""
+        return self._unique_id
+
+    @property
+    def device_class(self):
+        """Return the class of the sensor."""
+        return METER_SENSORS[self._kind][0]
+
+    @property
+    def unit_of_measurement(self):
+        """Return the units of measurement."""
+        return METER_SENSORS[self._kind][1]
+
+    @callback
+    def _update_from_coordinator(self):
+        """Update the state from the latest coordinator snapshot."""
+        device = self.coordinator.data.get(self._device_id)
+
+        if device is None:
+            return
+
+        self._name = "{} {}".format(device.name, self._kind)
+        self._device_info = device.device_info
+        self._value = getattr(device, self._kind)
+
+        LOGGER.debug("Update meter sensor state: %s = %s", self.entity_id, self._value)
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Handle updated data from the coordinator, writing only changes."""
+        self._update_from_coordinator()
+
+        written = (
+            self._name,
+            self._value,
+            self.available,
+            self.coordinator.restored,
+        )
+
+        if written == self._written:
+            self.coordinator.suppressed_writes += 1
+            return
+
+        self._written = written
+        self.async_write_ha_state()
+
+
+class SwitchBotCloudRemainingRequestsSensor(CoordinatorEntity, Entity):
+    """Sensor for the cloud requests an account has left today."""
+
+    def __init__(self, coordinator, entity_id, account_id, name, budget):
+        """Initialize a sensor."""
+        super().__init__(coordinator)
+
+        self.entity_id = entity_id
+        self._budget = budget
+
+        self._unique_id = "{}_remaining_requests".format(account_id)
+        self._name = name
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return self._name
+
+    @property
+    def state(self):
+        """Return the state of the sensor."""
+        return self._budget.remaining
+
+    @property
+    def unique_id(self):
+        """Return a unique ID."""
+        return self._unique_id
+
+    @property
+    def unit_of_measurement(self):
+        """Return the units of measurement."""
+        return "requests"
+
+    @property
+    def icon(self):
+        """Return the icon of the sensor."""
+        return "mdi:counter"
+
+
+class SwitchBotCloudMetricSensor(CoordinatorEntity, Entity):
+    """Diagnostic sensor for the cloud requests of an account."""
+
+    def __init__(self, coordinator, entity_id, account_id, name, metrics, metric):
+        """Initialize a sensor."""
+        super().__init__(coordinator)
+
+        self.entity_id = entity_id
+        self._metrics = metrics
+        self._metric = metric
+
+        self._unique_id = "{}_{}".format(account_id, metric)
+        self._name = name
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return self._name
+
+    @property
+    def state(self):
+        """Return the state of the sensor."""
+        if self._metric == "latency":
+            return self._metrics.percentile(95)
+
+        if self._metric == "command_latency":
+            return self._metrics.wait_percentile("turn_device", 95)
+
+        return self._metrics.errors
+
+    @property
+    def unique_id(self):
+        """Return a unique ID."""
+        return self._unique_id
+
+    @property
+    def entity_category(self):
+        """Return the category of the entity."""
+        return EntityCategory.DIAGNOSTIC
+
+    @property
+    def unit_of_measurement(self):
+        """Return the units of measurement."""
+        if self._metric in ("latency", "command_latency"):
+            return "ms"
+
+        return "errors"
+
+    @property
+    def icon(self):
+        """Return the icon of the sensor."""
+        return "mdi:cloud-check"
+
+    @property
+    def entity_registry_enabled_default(self):
+        """Return if the entity should be enabled when first added."""
+        return False
@@ -0,0 +1,58 @@
+"""Single-flight reads for switchbot_cloud."""
+import asyncio
+import time
+
+
+class SwitchBotCloudSingleFlight:
+    """Share one read between callers that ask for it at the same time.
+
+    Callers of a key that is being read wait for that read instead of sending
+    their own. The result is also reused by callers within a freshness TTL.
+    A caller that is cancelled does not cancel the read of the others.
+    """
+
+    def __init__(self) -> None:
+        """Initialize with nothing read."""
+        self._tasks = {}
+        self._results = {}
+
+    async def async_run(self, key, func, ttl: float = 0):
+        """Return the result of a coroutine function, shared under a key."""
+        result = self._results.get(key)
+
+        if result is not None and time.monotonic() - result[0] < ttl:
+            return result[1]
+
+        task = self._tasks.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(self._async_call(key, func))
+            self._tasks[key] = task
+
+        return await asyncio.shield(task)
+
+    async def _async_call(self, key, func):
+        """Read a key and remember the result."""
+        try:
+            result = await func()
+        finally:
+            self._tasks.pop(key, None)
+
+        self._results[key] = (time.monotonic(), result)
+
+        return result
+
+    def invalidate(self, key) -> None:
+        """Forget the result of a key so the next caller reads it again."""
+        self._results.pop(key, None)
+
+    async def async_clear(self) -> None:
+        """Cancel reads in progress and forget all results."""
+        tasks = list(self._tasks.values())
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self._results = {}
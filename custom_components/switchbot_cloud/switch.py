@@ -1,15 +1,14 @@
 """Switch platform for switchbot_cloud."""
-from datetime import timedelta
 from homeassistant.components.switch import ENTITY_ID_FORMAT, SwitchEntity
 from homeassistant.core import callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import async_generate_entity_id
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .account import get_account_from_config_entry
-from .const import DOMAIN, LOGGER, NAME, NEW_SWITCH, VERSION
+from .const import LOGGER, NEW_SWITCH
 
-SCAN_INTERVAL = timedelta(seconds=30)
-PARALLEL_UPDATES = 1
+PARALLEL_UPDATES = 0
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
@@ -25,7 +24,6 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
         for device in devices:
             device_id = device.id
             name = device.name
-            state = device.state
 
             if device_id in account.known_ids[NEW_SWITCH]:
                 continue
@@ -35,10 +33,12 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
             LOGGER.debug("Initialize %s", entity_id)
 
             entities.append(
-                SwitchBotCloudBinarySwitch(entity_id, device_id, device, name, state)
+                SwitchBotCloudBinarySwitch(
+                    account.coordinator, account.client, entity_id, device_id, name
+                )
             )
 
-            account.known_ids[NEW_SWITCH].append(device_id)
+            account.known_ids[NEW_SWITCH].add(device_id)
 
         if entities:
             async_add_entities(entities)
@@ -49,20 +49,26 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
         )
     )
 
+    async_add_switch(account.async_devices(NEW_SWITCH))
 
-class SwitchBotCloudBinarySwitch(SwitchEntity):
+
+class SwitchBotCloudBinarySwitch(CoordinatorEntity, SwitchEntity):
     """switchbot_cloud Switch class."""
 
-    def __init__(self, entity_id, device_id, device, name, state):
+    def __init__(self, coordinator, client, entity_id, device_id, name):
         """Initialize a sensor."""
-        super().__init__()
+        super().__init__(coordinator)
 
         self.entity_id = entity_id
-        self._device = device
+        self._client = client
 
         self._unique_id = device_id
         self._name = name
-        self._state = state
+        self._device_info = None
+        self._state = None
+        self._written = None
+
+        self._update_from_coordinator()
 
     @property
     def name(self):
@@ -72,42 +78,68 @@ class SwitchBotCloudBinarySwitch(SwitchEntity):
     @property
     def device_info(self):
         """Device info."""
-        return {
-            "identifiers": {(DOMAIN, self.unique_id)},
-            "name": self.name,
-            "manufacturer": NAME,
-            "model": VERSION,
-        }
+        return self._device_info
 
     @property
     def is_on(self):
         """Return true if the switch is on."""
         return self._state
 
+    @property
+    def extra_state_attributes(self):
+        """Return the state attributes, marking state restored from storage."""
+        if self.coordinator.restored:
+            return {"restored": True}
+
+        return None
+
     @property
     def unique_id(self):
         """Return a unique ID."""
         return self._unique_id
 
-    async def async_update(self):
-        """Update the sensor state."""
-        self._name = await self.hass.async_add_executor_job(
-            getattr, self._device, "name"
-        )
-        self._state = await self.hass.async_add_executor_job(
-            getattr, self._device, "state"
-        )
+    @callback
+    def _update_from_coordinator(self):
+        """Update the state from the latest coordinator snapshot."""
+        device = self.coordinator.data.get(self._unique_id)
+
+        if device is None:
+            return
+
+        self._name = device.name
+        self._device_info = device.device_info
+        self._state = device.state
 
         LOGGER.debug("Update switch state: %s = %s", self.entity_id, self._state)
 
+    @callback
+    def _handle_coordinator_update(self):
+        """Handle updated data from the coordinator, writing only changes."""
+        self._update_from_coordinator()
+        self._async_write_changed_state()
+
+    @callback
+    def _async_write_changed_state(self):
+        """Write the state unless it is the state written last."""
+        written = (self._name, self._state, self.available, self.coordinator.restored)
+
+        if written == self._written:
+            self.coordinator.suppressed_writes += 1
+            return
+
+        self._written = written
+        self.async_write_ha_state()
+
     async def async_turn_on(self):
         """Turn the entity on."""
-        await self.hass.async_add_executor_job(self._device.turn, True)
+        await self._client.async_turn(self._unique_id, True)
+        self.coordinator.async_poll_soon()
         self._state = True
-        self.async_schedule_update_ha_state()
+        self._async_write_changed_state()
 
     async def async_turn_off(self):
         """Turn the entity off."""
-        await self.hass.async_add_executor_job(self._device.turn, False)
+        await self._client.async_turn(self._unique_id, False)
+        self.coordinator.async_poll_soon()
         self._state = False
-        self.async_schedule_update_ha_state()
+        self._async_write_changed_state()
@@ -0,0 +1 @@
+"""Tests for switchbot_cloud."""
@@ -0,0 +1,21 @@
+"""Helpers for switchbot_cloud tests."""
+import threading
+
+from custom_components.switchbot_cloud.scheduler import LIST_INTERVAL
+
+
+def join_worker_threads() -> None:
+    """Wait for the threads of shut down worker pools to finish."""
+    for thread in threading.enumerate():
+        if thread.name.startswith("switchbot_cloud"):
+            thread.join()
+
+
+async def async_poll(hass, account) -> None:
+    """Fetch the device list and every device of an account now."""
+    # Forgetting every schedule makes the list and all devices due.
+    account.client.scheduler.listed((), -LIST_INTERVAL)
+    account.client.reads.invalidate("snapshot")
+
+    await account.coordinator.async_refresh()
+    await hass.async_block_till_done()
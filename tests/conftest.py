@@ -0,0 +1,115 @@
+"""Fixtures for switchbot_cloud tests."""
+import aiohttp
+import pytest
+
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.switchbot_cloud import api
+from custom_components.switchbot_cloud.account import get_account_from_config_entry
+from custom_components.switchbot_cloud.api import SwitchBotCloudApiClient
+from custom_components.switchbot_cloud.const import DOMAIN
+
+from .common import join_worker_threads
+from .fake_cloud import FakeSwitchBotCloud, PASSWORD, USERNAME
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Enable custom integrations in all tests."""
+    yield
+
+
+@pytest.fixture
+async def fake_cloud(request, monkeypatch, socket_enabled):
+    """Return a started fake cloud that the client talks to.
+
+    Tests change the devices of the cloud by parametrizing this fixture
+    indirectly with the arguments of the cloud.
+    """
+    cloud = FakeSwitchBotCloud(
+        **getattr(
+            request, "param", {"curtains": 2, "groups": 1, "bots": 1, "meters": 1}
+        )
+    )
+    await cloud.start()
+
+    monkeypatch.setattr(api, "COGNITO_URL", f"{cloud.url}/cognito")
+    monkeypatch.setattr(api, "RETRY_BACKOFF", 0)
+
+    for operation, url in cloud.api_urls.items():
+        monkeypatch.setitem(api.API_URLS, operation, url)
+
+    yield cloud
+
+    await cloud.close()
+
+
+@pytest.fixture
+async def client(fake_cloud):
+    """Return a client of the fake cloud, shut down after the test."""
+    async with aiohttp.ClientSession() as session:
+        client = SwitchBotCloudApiClient(session)
+
+        yield client
+
+        await client.async_shutdown()
+        client.executor.shutdown()
+        join_worker_threads()
+
+
+@pytest.fixture
+def config_entry(request, hass):
+    """Return a config entry of the fake cloud account.
+
+    Tests set the options of the entry by parametrizing this fixture
+    indirectly.
+    """
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title=USERNAME,
+        data={CONF_USERNAME: USERNAME, CONF_PASSWORD: PASSWORD},
+        options=getattr(request, "param", {}),
+    )
+    entry.add_to_hass(hass)
+
+    return entry
+
+
+@pytest.fixture
+async def account(hass, fake_cloud, config_entry):
+    """Return the account of a set up entry, unloaded after the test."""
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    yield get_account_from_config_entry(hass, config_entry)
+
+    await hass.config_entries.async_unload(config_entry.entry_id)
+    await hass.async_block_till_done()
+    join_worker_threads()
+
+
+class FakeClock:
+    """Clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        """Start the clock at an arbitrary time."""
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        """Return the current time."""
+        return self.now
+
+    def time(self) -> float:
+        """Return the current time as the wall clock."""
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        """Move the clock forward."""
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    """Return a clock to patch into the time module of a helper."""
+    return FakeClock()
@@ -0,0 +1,244 @@
+"""Local stand-in for the SwitchBot cloud."""
+import asyncio
+import base64
+import random
+
+from collections import Counter
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+USERNAME = "user@example.com"
+PASSWORD = "secret"
+
+ACCESS_TOKEN = "access-token"
+REFRESH_TOKEN = "refresh-token"
+USER_TOKEN = "user-token"
+
+
+def _mac(number: int) -> str:
+    """Return a device MAC address."""
+    return ":".join(f"{number:012X}"[i : i + 2] for i in range(0, 12, 2))
+
+
+class FakeSwitchBotCloud:
+    """Serve the Cognito login and the SwitchBot API from a local server.
+
+    Devices are made up on creation. Every request waits for the latency and
+    then fails with the error status at the error rate, so retries, the circuit
+    breaker and slow clouds can be tested without the real cloud.
+    """
+
+    def __init__(
+        self,
+        curtains: int = 0,
+        groups: int = 0,
+        bots: int = 0,
+        meters: int = 0,
+        plugs: int = 0,
+        latency: float = 0,
+        error_rate: float = 0,
+    ) -> None:
+        """Initialize the cloud with its devices."""
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = 503
+
+        self.devices = []
+        self.statuses = {}
+        self.commands = []
+        self.requests = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        self._server = None
+        self._number = 0
+
+        for _ in range(curtains):
+            self.add_device("WoCurtain", status={"position": 0, "battery": 90})
+
+        for _ in range(groups):
+            master = self.add_device("WoCurtain", status={"position": 0})
+            slave = self.add_device(
+                "WoCurtain", is_master=False, status={"position": 0, "battery": 80}
+            )
+            links = [master["device_mac"], slave["device_mac"]]
+            master["deviceLinks"] = slave["deviceLinks"] = links
+
+        for _ in range(bots):
+            self.add_device("WoHand", mode="1", status={"power": "off"})
+
+        for _ in range(meters):
+            self.add_device("WoMeterTH", status={"temperature": 20.5, "humidity": 40})
+
+        for _ in range(plugs):
+            self.add_device("WoPlugUS", status={"power": "off"})
+
+    def add_device(
+        self,
+        device_type: str,
+        is_master: bool = None,
+        mode: str = "0",
+        status: dict = None,
+    ) -> dict:
+        """Add a device and return its entry in the device list."""
+        self._number += 1
+        mac = _mac(self._number)
+        device = {
+            "device_mac": mac,
+            "device_name": f"{device_type} {self._number}",
+            "device_detail": {"device_type": device_type},
+        }
+
+        if device_type == "WoCurtain":
+            device["isMaster"] = True if is_master is None else is_master
+
+        self.devices.append(device)
+        self.statuses[mac.replace(":", "")] = {
+            "device_mac": mac,
+            "deviceMode": mode,
+            "status": dict(status or {}),
+        }
+
+        return device
+
+    def device_id(self, index: int) -> str:
+        """Return the ID the integration uses for a device."""
+        return self.devices[index]["device_mac"].replace(":", "")
+
+    @property
+    def url(self) -> str:
+        """Return the base URL of the server."""
+        return str(self._server.make_url(""))
+
+    @property
+    def connections(self) -> int:
+        """Return the number of open client connections."""
+        return len(self._server.runner.server.connections)
+
+    @property
+    def api_urls(self) -> dict:
+        """Return the URLs of the API operations."""
+        return {
+            "query_user": f"{self.url}/user",
+            "get_devices": f"{self.url}/devices",
+            "refresh_device": f"{self.url}/status",
+            "turn_device": f"{self.url}/action",
+        }
+
+    async def start(self) -> None:
+        """Start the server on a free local port."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/cognito", self._cognito)
+        app.router.add_get("/user", self._query_user)
+        app.router.add_get("/devices", self._get_devices)
+        app.router.add_post("/status", self._refresh_device)
+        app.router.add_post("/action", self._turn_device)
+
+        self._server = TestServer(app, host="127.0.0.1")
+        await self._server.start_server()
+
+    async def close(self) -> None:
+        """Stop the server."""
+        await self._server.close()
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        """Count the request, then apply the latency and error rate."""
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+
+            if self.error_rate and random.random() < self.error_rate:
+                self.requests["error"] += 1
+                return web.Response(status=self.error_status)
+
+            return await handler(request)
+        finally:
+            self.in_flight -= 1
+
+    @staticmethod
+    def _result(body) -> web.Response:
+        """Return a successful API response."""
+        return web.json_response({"statusCode": 100, "body": body})
+
+    async def _cognito(self, request: web.Request) -> web.Response:
+        """Answer a Cognito login or token refresh."""
+        target = request.headers["X-Amz-Target"].rsplit(".", 1)[-1]
+        data = await request.json()
+        self.requests[target] += 1
+
+        if target == "InitiateAuth" and data["AuthFlow"] == "USER_SRP_AUTH":
+            if data["AuthParameters"]["USERNAME"] != USERNAME:
+                return web.json_response(
+                    {"__type": "NotAuthorizedException", "message": "Bad login"},
+                    status=400,
+                )
+
+            # The password proof is not checked, any proof logs in.
+            return web.json_response(
+                {
+                    "ChallengeName": "PASSWORD_VERIFIER",
+                    "ChallengeParameters": {
+                        "USER_ID_FOR_SRP": USERNAME,
+                        "SRP_B": f"{random.getrandbits(3072):x}",
+                        "SALT": f"{random.getrandbits(128):x}",
+                        "SECRET_BLOCK": base64.b64encode(b"secret").decode(),
+                    },
+                }
+            )
+
+        result = {"AccessToken": ACCESS_TOKEN, "ExpiresIn": 3600}
+
+        if target == "RespondToAuthChallenge":
+            result["RefreshToken"] = REFRESH_TOKEN
+
+        return web.json_response({"AuthenticationResult": result})
+
+    def _check_token(self, request: web.Request, token: str) -> None:
+        """Reject a request without the expected token."""
+        if request.headers.get("Authorization") != token:
+            raise web.HTTPUnauthorized()
+
+    async def _query_user(self, request: web.Request) -> web.Response:
+        """Return the user with the token for commands."""
+        self._check_token(request, ACCESS_TOKEN)
+        self.requests["query_user"] += 1
+
+        return self._result({"openApiToken": {"token": USER_TOKEN}})
+
+    async def _get_devices(self, request: web.Request) -> web.Response:
+        """Return the device list."""
+        self._check_token(request, ACCESS_TOKEN)
+        self.requests["get_devices"] += 1
+
+        return self._result({"deviceList": self.devices})
+
+    async def _refresh_device(self, request: web.Request) -> web.Response:
+        """Return the status of a batch of devices."""
+        self._check_token(request, ACCESS_TOKEN)
+        self.requests["refresh_device"] += 1
+
+        data = await request.json()
+
+        return self._result(
+            {"items": [self.statuses[device_id] for device_id in data["items"]]}
+        )
+
+    async def _turn_device(self, request: web.Request) -> web.Response:
+        """Apply a device command, curtains arrive at once."""
+        self._check_token(request, USER_TOKEN)
+        self.requests["turn_device"] += 1
+
+        for item in (await request.json())["items"]:
+            self.commands.append((item["deviceID"], item["deviceCmd"]))
+            values = self.statuses[item["deviceID"]]["status"]
+
+            if item["deviceCmd"] == "setPosition":
+                values["position"] = int(item["parameter"].split(",")[2])
+            elif item["deviceCmd"] in ("turnOn", "turnOff"):
+                values["power"] = "on" if item["deviceCmd"] == "turnOn" else "off"
+
+        return self._result({})
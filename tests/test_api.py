@@ -0,0 +1,249 @@
+"""Tests for the API client against the fake cloud."""
+import asyncio
+import time
+
+import pytest
+
+from custom_components.switchbot_cloud.api import (
+    MAX_RETRIES,
+    SwitchBotCloudApiError,
+    SwitchBotCloudAuthError,
+    SwitchBotCloudBudgetError,
+    SwitchBotCloudUnavailableError,
+)
+from custom_components.switchbot_cloud.breaker import FAILURE_THRESHOLD
+from custom_components.switchbot_cloud.scheduler import (
+    BATTERY_INTERVAL,
+    FAST_INTERVAL,
+    LIST_INTERVAL,
+)
+
+from .fake_cloud import ACCESS_TOKEN, PASSWORD, USER_TOKEN, USERNAME
+
+
+async def test_login_and_snapshot(client, fake_cloud):
+    """Test a login and a first poll of every device."""
+    await client.authenticate(USERNAME, PASSWORD)
+    snapshot = await client.async_get_snapshot()
+
+    assert client.authenticated
+    assert sorted(device.type for device in snapshot.values()) == [
+        "Bot",
+        "Curtain",
+        "Curtain",
+        "CurtainGroup",
+        "Meter",
+    ]
+    assert fake_cloud.requests == {
+        "InitiateAuth": 1,
+        "RespondToAuthChallenge": 1,
+        "get_devices": 1,
+        "refresh_device": 1,
+    }
+
+    group = next(device for device in snapshot.values() if device.children)
+
+    assert len(group.children) == 2
+    assert group.battery == 80
+
+
+async def test_group_built_from_master(client, fake_cloud):
+    """Test a group is its master even when the slave is linked first."""
+    master, slave = fake_cloud.devices[2:4]
+    master["deviceLinks"] = slave["deviceLinks"] = [
+        slave["device_mac"],
+        master["device_mac"],
+    ]
+    fake_cloud.statuses[fake_cloud.device_id(2)]["status"]["position"] = 30
+
+    await client.authenticate(USERNAME, PASSWORD)
+    snapshot = await client.async_get_snapshot()
+    group = snapshot[fake_cloud.device_id(2)]
+
+    assert fake_cloud.device_id(3) not in snapshot
+    assert group.type == "CurtainGroup"
+    assert group.name == master["device_name"]
+    assert group.position == 30
+    assert [child.id for child in group.children] == [
+        fake_cloud.device_id(3),
+        fake_cloud.device_id(2),
+    ]
+
+
+async def test_sensor_only_devices_polled_slowly(client, fake_cloud):
+    """Test meters and slave curtains are not polled fast after a change."""
+    await client.authenticate(USERNAME, PASSWORD)
+    await client.async_get_snapshot()
+    ids = [fake_cloud.device_id(i) for i in range(len(fake_cloud.devices))]
+    soon = time.monotonic() + 2 * FAST_INTERVAL
+    later = time.monotonic() + BATTERY_INTERVAL / 2
+
+    assert client.scheduler.devices_due(ids, soon) == ids[:3] + ids[4:5]
+    assert client.scheduler.devices_due(ids, later) == ids[:3] + ids[4:]
+
+
+async def test_bad_login(client):
+    """Test a rejected login."""
+    with pytest.raises(SwitchBotCloudAuthError):
+        await client.authenticate("nobody@example.com", PASSWORD)
+
+    assert not client.authenticated
+
+
+@pytest.mark.parametrize(
+    "fake_cloud", [{"curtains": 1000, "groups": 250, "bots": 500}], indirect=True
+)
+async def test_large_account_polls_in_one_batch(client, fake_cloud):
+    """Test concurrent polls of a large account share one batch request."""
+    await client.authenticate(USERNAME, PASSWORD)
+    snapshots = await asyncio.gather(*(client.async_get_snapshot() for _ in range(10)))
+
+    assert len(snapshots[0]) == 1750
+    assert all(snapshot is snapshots[0] for snapshot in snapshots)
+    assert fake_cloud.requests["get_devices"] == 1
+    assert fake_cloud.requests["refresh_device"] == 1
+
+
+async def test_moves_coalesce(client, fake_cloud):
+    """Test only the last of quick moves is sent."""
+    await client.authenticate(USERNAME, PASSWORD)
+    await client.async_get_snapshot()
+    device_id = fake_cloud.device_id(0)
+
+    await asyncio.gather(*(client.async_move(device_id, i * 10) for i in range(5)))
+
+    assert fake_cloud.commands == [(device_id, "setPosition")]
+    assert fake_cloud.statuses[device_id]["status"]["position"] == 40
+    assert fake_cloud.requests["query_user"] == 1
+    assert client.estimated_position(device_id) == 0
+
+
+async def test_turn_bot(client, fake_cloud):
+    """Test a bot in switch mode is turned on."""
+    await client.authenticate(USERNAME, PASSWORD)
+    await client.async_get_snapshot()
+    device_id = fake_cloud.device_id(4)
+
+    await client.async_turn(device_id, True)
+
+    assert fake_cloud.commands == [(device_id, "turnOn")]
+
+
+@pytest.mark.parametrize("fake_cloud", [{"bots": 12}], indirect=True)
+async def test_commands_sent_up_to_limit(client, fake_cloud):
+    """Test the request lane lets in as many commands as the limit."""
+    await client.authenticate(USERNAME, PASSWORD)
+    await client.async_get_snapshot()
+    client.set_max_concurrent_commands(12)
+    fake_cloud.latency = 0.05
+
+    await asyncio.gather(
+        *(client.async_turn(fake_cloud.device_id(i), True) for i in range(12))
+    )
+
+    assert len(fake_cloud.commands) == 12
+    assert fake_cloud.max_in_flight == 12
+
+
+def _revoke_tokens(client) -> None:
+    """Replace the access and command tokens with ones the cloud rejects."""
+    state = client.dump_state()
+    state["tokens"] = {**state["tokens"], "access_token": "old", "user_token": "old"}
+    client.restore_state(state)
+
+
+async def test_rejected_token_refreshed_for_command(client, fake_cloud):
+    """Test a command with a revoked token refreshes the tokens and is sent."""
+    await client.authenticate(USERNAME, PASSWORD)
+    await client.async_get_snapshot()
+    device_id = fake_cloud.device_id(4)
+    _revoke_tokens(client)
+
+    await client.async_turn(device_id, True)
+
+    assert fake_cloud.commands == [(device_id, "turnOn")]
+    assert fake_cloud.requests["InitiateAuth"] == 2
+    assert fake_cloud.requests["query_user"] == 1
+    assert client.tokens["user_token"] == USER_TOKEN
+
+
+async def test_rejected_token_refreshed_for_poll(client, fake_cloud):
+    """Test a poll with a revoked token refreshes the tokens once."""
+    await client.authenticate(USERNAME, PASSWORD)
+    await client.async_get_snapshot()
+    _revoke_tokens(client)
+    client.reads.invalidate("snapshot")
+    client.scheduler.listed((), -LIST_INTERVAL)
+
+    assert len(await client.async_get_snapshot()) == 5
+    assert fake_cloud.requests["InitiateAuth"] == 2
+    assert client.tokens["access_token"] == ACCESS_TOKEN
+
+
+@pytest.mark.parametrize("status", [503, 429])
+async def test_retries_then_breaker_opens(client, fake_cloud, status):
+    """Test failed or rate limited polls are retried and open the breaker."""
+    await client.authenticate(USERNAME, PASSWORD)
+    fake_cloud.error_rate = 1
+    fake_cloud.error_status = status
+
+    for _ in range(FAILURE_THRESHOLD):
+        client.reads.invalidate("snapshot")
+
+        with pytest.raises(SwitchBotCloudApiError):
+            await client.async_get_snapshot()
+
+    assert fake_cloud.requests["error"] == FAILURE_THRESHOLD * (MAX_RETRIES + 1)
+    assert client.breaker.open
+
+    with pytest.raises(SwitchBotCloudUnavailableError):
+        await client.async_get_snapshot()
+
+    assert fake_cloud.requests["error"] == FAILURE_THRESHOLD * (MAX_RETRIES + 1)
+
+
+async def test_budget_charged_per_attempt(client, fake_cloud):
+    """Test every attempt sent takes from the budget, refused ones do not."""
+    await client.authenticate(USERNAME, PASSWORD)
+    fake_cloud.error_rate = 1
+
+    for _ in range(FAILURE_THRESHOLD):
+        client.reads.invalidate("snapshot")
+
+        with pytest.raises(SwitchBotCloudApiError):
+            await client.async_get_snapshot()
+
+    assert client.budget.used == FAILURE_THRESHOLD * (MAX_RETRIES + 1)
+
+    with pytest.raises(SwitchBotCloudUnavailableError):
+        await client.async_get_snapshot()
+
+    assert client.budget.used == FAILURE_THRESHOLD * (MAX_RETRIES + 1)
+
+
+async def test_command_over_budget(client, fake_cloud):
+    """Test commands are refused once the daily limit is used up."""
+    await client.authenticate(USERNAME, PASSWORD)
+    await client.async_get_snapshot()
+    client.budget.used = client.budget.daily_limit
+
+    with pytest.raises(SwitchBotCloudBudgetError):
+        await client.async_turn(fake_cloud.device_id(4), True)
+
+    assert fake_cloud.commands == []
+
+
+async def test_shutdown_drops_queued_move(client, fake_cloud):
+    """Test shutting down cancels a move that is not sent yet."""
+    await client.authenticate(USERNAME, PASSWORD)
+    await client.async_get_snapshot()
+    move = asyncio.ensure_future(client.async_move(fake_cloud.device_id(0), 50))
+    await asyncio.sleep(0)
+
+    await client.async_shutdown()
+
+    with pytest.raises(asyncio.CancelledError):
+        await move
+
+    assert fake_cloud.commands == []
+    assert client.dump_state()["devices"] == {}
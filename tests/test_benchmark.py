@@ -0,0 +1,165 @@
+"""Benchmarks of switchbot_cloud against a large fake cloud.
+
+Benchmarks are skipped by default. Run them with ``pytest -m bench -s`` to
+print their numbers. Each one also fails when a number is well past what the
+integration does today, so large regressions are caught.
+"""
+import gc
+import statistics
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+from custom_components.switchbot_cloud import budget, scheduler, singleflight
+from custom_components.switchbot_cloud.account import get_account_from_config_entry
+from custom_components.switchbot_cloud.budget import DEFAULT_DAILY_LIMIT
+from custom_components.switchbot_cloud.executor import EXECUTOR_WORKERS
+
+from .common import async_poll, join_worker_threads
+
+pytestmark = [
+    pytest.mark.bench,
+    pytest.mark.parametrize(
+        "fake_cloud",
+        [{"curtains": 1000, "groups": 250, "bots": 500, "meters": 250}],
+        indirect=True,
+    ),
+]
+
+POLL_CYCLES = 20
+SIMULATED_HOURS = 24
+
+SETUP_TIME = 60
+MEMORY_PER_DEVICE = 64 * 1024
+POLL_CYCLE_TIME = 5
+
+
+def _report(record_property, name: str, **numbers) -> None:
+    """Print the numbers of a benchmark and add them to the test report."""
+    print(f"\n{name}: " + ", ".join(f"{key}={value}" for key, value in numbers.items()))
+
+    for key, value in numbers.items():
+        record_property(key, value)
+
+
+def _worker_threads() -> int:
+    """Return the number of worker threads of the integration."""
+    return sum(
+        1
+        for thread in threading.enumerate()
+        if thread.name.startswith("switchbot_cloud")
+    )
+
+
+async def test_setup(hass, fake_cloud, config_entry, record_property):
+    """Measure setting up an account with thousands of devices."""
+    devices = len(fake_cloud.devices)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    try:
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+        elapsed = time.perf_counter() - start
+        gc.collect()
+        memory = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    threads = _worker_threads()
+    entities = len(hass.states.async_all())
+    account = get_account_from_config_entry(hass, config_entry)
+    polls = account.client.metrics.as_dict()["snapshot"]["count"]
+
+    _report(
+        record_property,
+        "setup",
+        devices=devices,
+        entities=entities,
+        seconds=round(elapsed, 2),
+        bytes_per_device=memory // devices,
+        worker_threads=threads,
+        polls=polls,
+        requests=sum(fake_cloud.requests.values()),
+    )
+
+    assert elapsed < SETUP_TIME
+    assert memory / devices < MEMORY_PER_DEVICE
+    assert threads <= EXECUTOR_WORKERS
+    assert fake_cloud.requests["get_devices"] == 1
+    assert fake_cloud.requests["refresh_device"] <= polls
+
+    await hass.config_entries.async_unload(config_entry.entry_id)
+    await hass.async_block_till_done()
+    join_worker_threads()
+
+
+@pytest.mark.parametrize("latency", [0, 0.2])
+async def test_poll_cycle(hass, fake_cloud, account, latency, record_property):
+    """Measure full polls of every device, with and without cloud latency."""
+    account.engine.async_remove(account.coordinator)
+    fake_cloud.latency = latency
+    fake_cloud.max_in_flight = 0
+    cycles = []
+
+    for _ in range(POLL_CYCLES):
+        start = time.perf_counter()
+        await async_poll(hass, account)
+        cycles.append(time.perf_counter() - start)
+
+    cycles.sort()
+    overhead = cycles[int(len(cycles) * 0.95)] - 2 * latency
+
+    _report(
+        record_property,
+        f"poll cycle, {latency}s latency",
+        p50_seconds=round(statistics.median(cycles), 3),
+        p95_seconds=round(cycles[int(len(cycles) * 0.95)], 3),
+        max_in_flight=fake_cloud.max_in_flight,
+        suppressed_writes=account.coordinator.suppressed_writes,
+    )
+
+    assert overhead < POLL_CYCLE_TIME
+    assert fake_cloud.requests["refresh_device"] == POLL_CYCLES + 1
+    assert fake_cloud.max_in_flight == 1
+
+
+async def test_requests_per_minute(
+    hass, fake_cloud, account, monkeypatch, clock, record_property
+):
+    """Measure the requests of an idle account over a simulated day.
+
+    The account is polled on its own schedule with the clock moved forward
+    to each poll, so a day takes seconds.
+    """
+    clock.now = time.monotonic()
+
+    for module in (budget, scheduler, singleflight):
+        monkeypatch.setattr(module, "time", clock)
+
+    # Polls are run here on the simulated clock instead of the engine timer.
+    account.engine.async_remove(account.coordinator)
+    requests = sum(fake_cloud.requests.values())
+    end = clock.now + SIMULATED_HOURS * 3600
+    polls = 0
+
+    while clock.now < end:
+        clock.advance(account.client.poll_interval().total_seconds())
+        await account.coordinator.async_refresh()
+        polls += 1
+
+    per_minute = (sum(fake_cloud.requests.values()) - requests) / (SIMULATED_HOURS * 60)
+
+    _report(
+        record_property,
+        "idle account",
+        polls_per_hour=round(polls / SIMULATED_HOURS, 1),
+        requests_per_minute=round(per_minute, 2),
+        requests_per_day=round(per_minute * 1440),
+    )
+
+    assert per_minute * 1440 < DEFAULT_DAILY_LIMIT
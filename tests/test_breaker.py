@@ -0,0 +1,96 @@
+"""Tests for the circuit breaker."""
+import pytest
+
+from custom_components.switchbot_cloud import breaker
+from custom_components.switchbot_cloud.breaker import (
+    FAILURE_THRESHOLD,
+    MAX_RESET_TIMEOUT,
+    RESET_TIMEOUT,
+    SwitchBotCloudCircuitBreaker,
+)
+
+
+@pytest.fixture
+def circuit(monkeypatch, clock):
+    """Return a breaker running on the test clock."""
+    monkeypatch.setattr(breaker, "time", clock)
+
+    return SwitchBotCloudCircuitBreaker()
+
+
+def _trip(circuit):
+    """Fail enough requests to open the breaker."""
+    for _ in range(FAILURE_THRESHOLD):
+        circuit.failure()
+
+
+def test_opens_after_threshold(circuit):
+    """Test the breaker opens on the threshold of failures in a row."""
+    for _ in range(FAILURE_THRESHOLD - 1):
+        circuit.failure()
+
+    assert not circuit.open
+    assert circuit.allow()
+
+    circuit.failure()
+
+    assert circuit.open
+    assert not circuit.allow()
+    assert circuit.retry_in() == RESET_TIMEOUT
+
+
+def test_success_resets_failures(circuit):
+    """Test a success in between failures keeps the breaker closed."""
+    for _ in range(FAILURE_THRESHOLD - 1):
+        circuit.failure()
+
+    circuit.success()
+    circuit.failure()
+
+    assert not circuit.open
+
+
+def test_single_probe_after_timeout(circuit, clock):
+    """Test one probe is let through once the reset timeout has passed."""
+    _trip(circuit)
+    clock.advance(RESET_TIMEOUT)
+
+    assert circuit.allow()
+    assert not circuit.allow()
+
+
+def test_failed_probe_doubles_timeout(circuit, clock):
+    """Test the reset timeout doubles after each failed probe, up to a cap."""
+    _trip(circuit)
+    timeout = RESET_TIMEOUT
+
+    while timeout < MAX_RESET_TIMEOUT:
+        clock.advance(timeout)
+        assert circuit.allow()
+
+        circuit.failure()
+        timeout = min(timeout * 2, MAX_RESET_TIMEOUT)
+
+        assert circuit.retry_in() == timeout
+
+    clock.advance(timeout)
+    circuit.allow()
+    circuit.failure()
+
+    assert circuit.retry_in() == MAX_RESET_TIMEOUT
+
+
+def test_listener_told_of_changes(circuit, clock):
+    """Test the listener is told when the breaker opens and closes."""
+    changes = []
+    circuit.listener = changes.append
+
+    _trip(circuit)
+    circuit.failure()
+    clock.advance(RESET_TIMEOUT)
+    circuit.allow()
+    circuit.success()
+    circuit.success()
+
+    assert changes == [False, True]
+    assert not circuit.open
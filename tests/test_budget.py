@@ -0,0 +1,89 @@
+"""Tests for the request budget."""
+import pytest
+
+from custom_components.switchbot_cloud import budget
+from custom_components.switchbot_cloud.budget import SwitchBotCloudRequestBudget
+
+DAILY_LIMIT = 2400
+
+
+@pytest.fixture
+def bucket(monkeypatch, clock):
+    """Return a budget of 100 requests an hour running on the test clock."""
+    monkeypatch.setattr(budget, "time", clock)
+
+    return SwitchBotCloudRequestBudget(DAILY_LIMIT)
+
+
+def test_polls_leave_reserve_for_commands(bucket):
+    """Test polls stop short of the bucket reserve while commands do not."""
+    polls = 0
+
+    while bucket.try_acquire():
+        polls += 1
+
+    assert polls == 90
+    assert bucket.try_acquire(command=True)
+    assert bucket.used == 91
+
+
+def test_refill_over_time(bucket, clock):
+    """Test tokens refill evenly across the day."""
+    while bucket.try_acquire():
+        pass
+
+    assert bucket.wait_time() == pytest.approx(36)
+
+    clock.advance(36)
+
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_daily_limit(bucket, clock):
+    """Test the daily limit holds whatever the bucket refill."""
+    bucket.used = DAILY_LIMIT - 1
+    clock.advance(3600)
+
+    assert not bucket.try_acquire()
+    assert bucket.wait_time() > 0
+    assert bucket.try_acquire(command=True)
+    assert not bucket.try_acquire(command=True)
+    assert bucket.remaining == 0
+
+
+def test_set_daily_limit(bucket):
+    """Test a changed limit applies to the next request."""
+    bucket.set_daily_limit(240)
+
+    assert bucket.wait_time() == 0
+
+    bucket.used = 216
+
+    assert not bucket.try_acquire()
+
+
+def test_restore_same_day(bucket, clock):
+    """Test requests used today and the bucket survive a restart."""
+    for _ in range(50):
+        bucket.try_acquire()
+
+    state = bucket.dump_state()
+    clock.advance(36)
+    restarted = SwitchBotCloudRequestBudget(DAILY_LIMIT)
+    restarted.restore_state(state)
+
+    assert restarted.used == 50
+    assert restarted.remaining == DAILY_LIMIT - 50
+    assert restarted.wait_time(52, command=True) == pytest.approx(36)
+
+
+def test_restore_other_day(bucket):
+    """Test requests stored on another day are not counted."""
+    bucket.try_acquire()
+    state = {**bucket.dump_state(), "day": "2000-01-01"}
+    restarted = SwitchBotCloudRequestBudget(DAILY_LIMIT)
+    restarted.restore_state(state)
+
+    assert restarted.used == 0
+    assert restarted.remaining == DAILY_LIMIT
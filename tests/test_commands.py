@@ -0,0 +1,152 @@
+"""Tests for the command queue, dispatcher and request lane."""
+import asyncio
+
+import pytest
+
+from custom_components.switchbot_cloud.commands import (
+    SwitchBotCloudCommandDispatcher,
+    SwitchBotCloudCommandQueue,
+    SwitchBotCloudRequestLane,
+)
+
+DEBOUNCE = 0.01
+
+
+def _command(sent: list, value, delay: float = 0):
+    """Return a command that records its value once sent."""
+
+    async def command():
+        await asyncio.sleep(delay)
+        sent.append(value)
+
+    return command
+
+
+async def test_queue_coalesces():
+    """Test only the latest of commands sent together reaches the cloud."""
+    queue = SwitchBotCloudCommandQueue(DEBOUNCE)
+    sent = []
+
+    await asyncio.gather(*(queue.async_send(_command(sent, i)) for i in range(5)))
+
+    assert sent == [4]
+
+
+async def test_queue_sends_again_after_send():
+    """Test a command queued while another is sent is sent after it."""
+    queue = SwitchBotCloudCommandQueue(DEBOUNCE)
+    sent = []
+
+    first = asyncio.ensure_future(queue.async_send(_command(sent, 1, 0.05)))
+    await asyncio.sleep(DEBOUNCE * 2)
+    await asyncio.gather(first, queue.async_send(_command(sent, 2)))
+
+    assert sent == [1, 2]
+
+
+async def test_queue_error_reaches_all_callers():
+    """Test every caller of a failed command gets its error."""
+    queue = SwitchBotCloudCommandQueue(DEBOUNCE)
+
+    async def fail():
+        raise ValueError("failed")
+
+    results = await asyncio.gather(
+        queue.async_send(fail), queue.async_send(fail), return_exceptions=True
+    )
+
+    assert [type(result) for result in results] == [ValueError, ValueError]
+
+
+@pytest.mark.parametrize("sending", [False, True])
+async def test_queue_cancel(sending):
+    """Test cancelling a queue cancels its callers, also while sending."""
+    queue = SwitchBotCloudCommandQueue(DEBOUNCE)
+    sent = []
+    caller = asyncio.ensure_future(queue.async_send(_command(sent, 1, 10)))
+
+    await asyncio.sleep(DEBOUNCE * 2 if sending else 0)
+    await queue.async_cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(caller, 1)
+
+    assert sent == []
+
+
+async def test_dispatcher_limit():
+    """Test commands to different devices run in parallel up to the limit."""
+    dispatcher = SwitchBotCloudCommandDispatcher(2)
+    running = []
+    peak = []
+
+    async def command():
+        running.append(None)
+        peak.append(len(running))
+        await asyncio.sleep(DEBOUNCE)
+        running.pop()
+
+    await asyncio.gather(
+        *(dispatcher.async_run(f"device{i}", command) for i in range(5))
+    )
+
+    assert max(peak) == 2
+
+
+async def test_dispatcher_device_order():
+    """Test commands to the same device run one at a time in order."""
+    dispatcher = SwitchBotCloudCommandDispatcher(4)
+    sent = []
+
+    await asyncio.gather(
+        dispatcher.async_run("device", _command(sent, 1, DEBOUNCE)),
+        dispatcher.async_run("device", _command(sent, 2)),
+    )
+
+    assert sent == [1, 2]
+
+
+async def test_lane_keeps_slot_for_commands():
+    """Test polls leave a slot free and commands go ahead of waiting polls."""
+    lane = SwitchBotCloudRequestLane(2)
+    order = []
+    release = asyncio.Event()
+
+    async def request(name, command):
+        async with lane.slot(command):
+            order.append(name)
+            await release.wait()
+
+    first = asyncio.ensure_future(request("poll1", False))
+    await asyncio.sleep(0)
+    second = asyncio.ensure_future(request("poll2", False))
+    await asyncio.sleep(0)
+    command = asyncio.ensure_future(request("command", True))
+    await asyncio.sleep(0)
+
+    assert order == ["poll1", "command"]
+
+    release.set()
+    await asyncio.gather(first, second, command)
+
+    assert order == ["poll1", "command", "poll2"]
+
+
+async def test_lane_cancelled_waiter():
+    """Test a request cancelled while waiting gives up its place."""
+    lane = SwitchBotCloudRequestLane(2)
+    release = asyncio.Event()
+
+    async def request(command):
+        async with lane.slot(command):
+            await release.wait()
+
+    first = asyncio.ensure_future(request(False))
+    await asyncio.sleep(0)
+    waiting = asyncio.ensure_future(request(False))
+    await asyncio.sleep(0)
+
+    waiting.cancel()
+    release.set()
+    await asyncio.gather(first, waiting, return_exceptions=True)
+    await asyncio.wait_for(request(False), 1)
@@ -0,0 +1,87 @@
+"""Tests for the cover platform."""
+import pytest
+
+from homeassistant.components.cover import (
+    ATTR_CURRENT_POSITION,
+    ATTR_POSITION,
+    DOMAIN as COVER_DOMAIN,
+    SERVICE_SET_COVER_POSITION,
+)
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+
+from custom_components.switchbot_cloud import motion
+from custom_components.switchbot_cloud.const import CONF_POSITION_TOLERANCE, DOMAIN
+from custom_components.switchbot_cloud.motion import START_DELAY
+
+from .common import async_poll
+
+CURTAIN = "cover.wocurtain_1"
+
+
+def _position(hass, entity_id: str = CURTAIN) -> int:
+    """Return the position of a cover in Home Assistant."""
+    return hass.states.get(entity_id).attributes.get(ATTR_CURRENT_POSITION)
+
+
+@pytest.mark.parametrize("config_entry", [{CONF_POSITION_TOLERANCE: 5}], indirect=True)
+async def test_position_tolerance(hass, fake_cloud, account):
+    """Test small position changes are ignored and larger ones are written."""
+    values = fake_cloud.statuses[fake_cloud.device_id(0)]["status"]
+    values["position"] = 30
+    await async_poll(hass, account)
+
+    assert _position(hass) == 70
+
+    values["position"] = 33
+    await async_poll(hass, account)
+
+    assert _position(hass) == 70
+
+    values["position"] = 40
+    await async_poll(hass, account)
+
+    assert _position(hass) == 60
+
+
+async def test_estimate_shown_during_move(
+    hass, fake_cloud, account, monkeypatch, clock
+):
+    """Test updates during a move show the estimate, not the last read."""
+    monkeypatch.setattr(motion, "time", clock)
+
+    await hass.services.async_call(
+        COVER_DOMAIN,
+        SERVICE_SET_COVER_POSITION,
+        {ATTR_ENTITY_ID: CURTAIN, ATTR_POSITION: 0},
+        blocking=True,
+    )
+    clock.advance(START_DELAY + 10)
+    account.coordinator.async_update_listeners()
+
+    assert _position(hass) == 50
+
+
+async def test_removed_curtain_removes_cover(hass, fake_cloud, account):
+    """Test a curtain gone from the cloud loses its device and entities."""
+    device_id = fake_cloud.device_id(1)
+    fake_cloud.devices.pop(1)
+
+    await async_poll(hass, account)
+
+    assert dr.async_get(hass).async_get_device({(DOMAIN, device_id)}) is None
+    assert er.async_get(hass).async_get("cover.wocurtain_2") is None
+    assert er.async_get(hass).async_get(CURTAIN) is not None
+
+
+async def test_renamed_curtain_renames_device(hass, fake_cloud, account):
+    """Test a curtain renamed in the app renames its device."""
+    device_id = fake_cloud.device_id(0)
+    fake_cloud.devices[0]["device_name"] = "Bedroom"
+
+    await async_poll(hass, account)
+
+    device = dr.async_get(hass).async_get_device({(DOMAIN, device_id)})
+
+    assert device.name == "Bedroom"
+    assert hass.states.get(CURTAIN).name == "Bedroom"
@@ -0,0 +1,79 @@
+"""Tests for the shared polling engine."""
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from custom_components.switchbot_cloud.engine import SwitchBotCloudEngine
+
+
+class FakeCoordinator:
+    """Coordinator whose polls run until released."""
+
+    def __init__(self, name: str, polls: list) -> None:
+        """Initialize the coordinator."""
+        self.name = name
+        self.release = asyncio.Event()
+        self._polls = polls
+
+    async def async_refresh(self) -> None:
+        """Record the poll and wait to be released."""
+        self._polls.append(self.name)
+        await self.release.wait()
+
+
+@pytest.fixture
+async def engine(hass):
+    """Return an engine stopped after the test."""
+    engine = SwitchBotCloudEngine(hass, limit=2)
+
+    yield engine
+
+    engine.async_stop()
+
+
+async def _async_run_loop() -> None:
+    """Let the timer and the started polls run."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_polls_run_concurrently_up_to_limit(engine):
+    """Test a slow poll does not hold up others, within the limit."""
+    polls = []
+    coordinators = [FakeCoordinator(f"account {i}", polls) for i in range(3)]
+
+    for delay, coordinator in enumerate(coordinators):
+        engine.async_add(coordinator)
+        engine.async_schedule(coordinator, timedelta(seconds=-10 + delay))
+
+    await _async_run_loop()
+
+    assert polls == ["account 0", "account 1"]
+
+    coordinators[1].release.set()
+    await _async_run_loop()
+
+    assert polls == ["account 0", "account 1", "account 2"]
+
+
+async def test_remove_cancels_running_poll(engine):
+    """Test removing an account cancels its poll and frees its place."""
+    polls = []
+    slow, other, waiting = (
+        FakeCoordinator(name, polls) for name in ("slow", "other", "waiting")
+    )
+
+    for coordinator in (slow, other, waiting):
+        engine.async_add(coordinator)
+        engine.async_schedule(coordinator, timedelta(0))
+
+    await _async_run_loop()
+
+    assert polls == ["slow", "other"]
+
+    engine.async_remove(slow)
+    await _async_run_loop()
+
+    assert engine.coordinators == [other, waiting]
+    assert polls == ["slow", "other", "waiting"]
@@ -0,0 +1,73 @@
+"""Tests for the worker pool."""
+import asyncio
+import threading
+
+import pytest
+
+from custom_components.switchbot_cloud.executor import (
+    EXECUTOR_WORKERS,
+    SwitchBotCloudExecutor,
+    SwitchBotCloudExecutorFull,
+)
+
+from .common import join_worker_threads
+
+
+@pytest.fixture
+def pool():
+    """Return a pool that is shut down after the test."""
+    pool = SwitchBotCloudExecutor(queue_depth=1, timeout=1)
+
+    yield pool
+
+    pool.shutdown()
+    join_worker_threads()
+
+
+async def test_runs_in_worker_thread(pool):
+    """Test calls run in the threads of the pool."""
+    name = await pool.async_run(lambda: threading.current_thread().name)
+
+    assert name.startswith("switchbot_cloud")
+    assert pool.pending == 0
+
+
+async def test_refuses_when_full(pool):
+    """Test calls beyond the workers and queue depth are refused."""
+    release = threading.Event()
+    calls = [
+        asyncio.ensure_future(pool.async_run(release.wait))
+        for _ in range(EXECUTOR_WORKERS + 1)
+    ]
+    await asyncio.sleep(0)
+
+    assert pool.pending == EXECUTOR_WORKERS + 1
+
+    with pytest.raises(SwitchBotCloudExecutorFull):
+        await pool.async_run(release.wait)
+
+    release.set()
+    await asyncio.gather(*calls)
+
+    assert pool.pending == 0
+
+
+async def test_timeout_keeps_slot(pool):
+    """Test a call that timed out keeps its slot until its thread ends."""
+    release = threading.Event()
+    pool.configure(queue_depth=1, timeout=0.01)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await pool.async_run(release.wait)
+
+    assert pool.pending == 1
+
+    release.set()
+
+    for _ in range(100):
+        if not pool.pending:
+            break
+
+        await asyncio.sleep(0.01)
+
+    assert pool.pending == 0
@@ -0,0 +1,127 @@
+"""Tests for setting up, unloading and reloading switchbot_cloud."""
+import asyncio
+import gc
+import logging
+import tracemalloc
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.helpers.storage import Store
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.switchbot_cloud.const import DATA_ENGINE, DOMAIN
+
+from .common import join_worker_threads
+from .fake_cloud import PASSWORD
+
+INTEGRATION = "custom_components.switchbot_cloud"
+
+RELOADS = 100
+WARM_UP = 10
+
+# Home Assistant itself keeps a few KiB per reload, such as the entity
+# platforms it has set up, so only growth well beyond that fails.
+MEMORY_GROWTH = 8 * 1024 * RELOADS
+
+
+def _count_objects() -> int:
+    """Return the number of live objects of the integration's classes."""
+    return sum(
+        1
+        for obj in gc.get_objects()
+        if str(getattr(type(obj), "__module__", "")).startswith(INTEGRATION)
+    )
+
+
+async def _async_settle(hass) -> None:
+    """Wait for setup, unload and the background tasks they start."""
+    await hass.async_block_till_done()
+    await asyncio.sleep(0)
+    await hass.async_block_till_done()
+
+
+async def test_setup_and_unload(hass, fake_cloud, config_entry):
+    """Test an entry sets up its entities and unloads completely."""
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await _async_settle(hass)
+
+    assert config_entry.state is ConfigEntryState.LOADED
+    assert hass.states.get("cover.wocurtain_1") is not None
+    assert hass.states.get("switch.wohand_5") is not None
+    assert hass.states.get("sensor.wometerth_6_temperature") is not None
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    await _async_settle(hass)
+
+    assert config_entry.state is ConfigEntryState.NOT_LOADED
+    assert hass.data[DOMAIN] == {}
+
+    join_worker_threads()
+
+
+async def test_setup_failure_retries(hass, fake_cloud):
+    """Test a rejected login releases the account and retries later."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="nobody",
+        data={CONF_USERNAME: "nobody@example.com", CONF_PASSWORD: PASSWORD},
+    )
+    entry.add_to_hass(hass)
+
+    assert not await hass.config_entries.async_setup(entry.entry_id)
+    await _async_settle(hass)
+
+    assert entry.state is ConfigEntryState.SETUP_RETRY
+    assert DATA_ENGINE not in hass.data[DOMAIN]
+    assert entry.entry_id not in hass.data[DOMAIN]
+
+    await hass.config_entries.async_unload(entry.entry_id)
+    join_worker_threads()
+
+
+async def test_reload_soak(hass, fake_cloud, config_entry, caplog):
+    """Test reloading an entry many times leaks no tasks, memory or sockets."""
+    # Captured log records are kept until the test ends.
+    caplog.set_level(logging.WARNING)
+
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await _async_settle(hass)
+
+    async def async_reload():
+        assert await hass.config_entries.async_reload(config_entry.entry_id)
+        await _async_settle(hass)
+
+        # The mocked storage keeps every call, which is not ours to release.
+        Store._async_load.reset_mock()
+        Store._async_write_data.reset_mock()
+
+    for _ in range(WARM_UP):
+        await async_reload()
+
+    join_worker_threads()
+    gc.collect()
+    objects = _count_objects()
+    tasks = len(asyncio.all_tasks())
+    connections = fake_cloud.connections
+    tracemalloc.start()
+    memory = tracemalloc.get_traced_memory()[0]
+
+    try:
+        for _ in range(RELOADS):
+            await async_reload()
+
+        join_worker_threads()
+        gc.collect()
+        growth = tracemalloc.get_traced_memory()[0] - memory
+    finally:
+        tracemalloc.stop()
+
+    assert config_entry.state is ConfigEntryState.LOADED
+    assert _count_objects() <= objects
+    assert len(asyncio.all_tasks()) <= tasks
+    assert fake_cloud.connections <= connections
+    assert growth < MEMORY_GROWTH
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    await _async_settle(hass)
+    join_worker_threads()
@@ -0,0 +1,85 @@
+"""Tests for request metrics."""
+import pytest
+
+from custom_components.switchbot_cloud import metrics
+from custom_components.switchbot_cloud.metrics import (
+    SAMPLE_SIZE,
+    SwitchBotCloudMetrics,
+)
+
+
+@pytest.fixture
+def stats(monkeypatch, clock):
+    """Return metrics running on the test clock."""
+    monkeypatch.setattr(metrics, "time", clock)
+
+    return SwitchBotCloudMetrics()
+
+
+def _call(stats, clock, operation: str, seconds: float, error: bool = False):
+    """Track a call of an operation that takes some time."""
+    try:
+        with stats.track(operation):
+            clock.advance(seconds)
+
+            if error:
+                raise ValueError("failed")
+    except ValueError:
+        pass
+
+
+def test_counts_and_percentiles(stats, clock):
+    """Test calls, errors and latency percentiles of an operation."""
+    for i in range(1, 101):
+        _call(stats, clock, "get_devices", i / 1000, error=i > 98)
+
+    stats.retry("get_devices")
+
+    assert stats.as_dict() == {
+        "get_devices": {
+            "count": 100,
+            "errors": 2,
+            "retries": 1,
+            "p50_ms": 51.0,
+            "p95_ms": 96.0,
+            "p99_ms": 100.0,
+            "wait_p95_ms": None,
+        }
+    }
+    assert stats.errors == 2
+
+
+def test_percentile_over_operations(stats, clock):
+    """Test the overall percentile covers every operation."""
+    _call(stats, clock, "get_devices", 0.1)
+    _call(stats, clock, "refresh_device", 0.3)
+
+    assert stats.percentile(99) == 300.0
+    assert stats.percentile(0) == 100.0
+
+
+def test_waits(stats):
+    """Test queue waits are kept per operation."""
+    for i in range(1, 21):
+        stats.wait("turn_device", i / 100)
+
+    assert stats.wait_percentile("turn_device", 95) == 200.0
+    assert stats.wait_percentile("get_devices", 95) is None
+
+
+def test_sample_size(stats, clock):
+    """Test only the most recent calls are kept for percentiles."""
+    for _ in range(SAMPLE_SIZE):
+        _call(stats, clock, "get_devices", 1)
+
+    _call(stats, clock, "get_devices", 0)
+
+    assert stats.percentile(0) == 0.0
+    assert stats.as_dict()["get_devices"]["count"] == SAMPLE_SIZE + 1
+
+
+def test_empty(stats):
+    """Test metrics without calls."""
+    assert stats.as_dict() == {}
+    assert stats.errors == 0
+    assert stats.percentile(50) is None
@@ -0,0 +1,126 @@
+"""Tests for the curtain motion model."""
+import pytest
+
+from custom_components.switchbot_cloud.motion import (
+    DEFAULT_SPEED,
+    SPEED_PROBE,
+    START_DELAY,
+    SwitchBotCloudMotionModel,
+)
+
+NOW = 1000.0
+
+
+@pytest.fixture
+def model():
+    """Return a model moving a curtain from 0 to 100."""
+    model = SwitchBotCloudMotionModel()
+    model.start(0, 100, NOW)
+
+    return model
+
+
+def test_arrival(model):
+    """Test the arrival is predicted from the start delay and speed."""
+    assert model.moving
+    assert model.target == 100
+    assert model.arrival == NOW + START_DELAY + 100 / DEFAULT_SPEED
+
+
+def test_estimate(model):
+    """Test the position is interpolated along the move."""
+    assert model.estimate(NOW) == 0
+    assert model.estimate(NOW + START_DELAY + 4) == 20
+    assert model.estimate(NOW + 1000) == 100
+
+
+def test_estimate_closing():
+    """Test the position is interpolated towards a lower target."""
+    model = SwitchBotCloudMotionModel()
+    model.start(80, 30, NOW)
+
+    assert model.estimate(NOW + START_DELAY + 2) == 70
+
+
+def test_arrived_nudges_speed_up(model):
+    """Test a curtain found at its target ends the move and speeds up."""
+    assert model.observe(99, model.arrival)
+    assert not model.moving
+    assert model.estimate() is None
+    assert model.speed == pytest.approx(DEFAULT_SPEED * SPEED_PROBE)
+
+
+def test_short_of_target_learns_speed(model):
+    """Test a curtain short of its target blends in the measured speed."""
+    assert not model.observe(50, model.arrival)
+    assert model.moving
+    assert model.speed == pytest.approx(3.75)
+    assert model.arrival == pytest.approx(NOW + START_DELAY + 100 / 3.75)
+
+
+def test_early_read_keeps_move_open():
+    """Test a read before the curtain starts to move waits for the arrival."""
+    model = SwitchBotCloudMotionModel()
+    model.start(100, 0, NOW)
+    arrival = model.arrival
+
+    assert not model.observe(100, NOW + 1)
+    assert not model.observe(100, NOW + START_DELAY + 4)
+    assert model.moving
+    assert model.arrival == arrival
+    assert model.speed == DEFAULT_SPEED
+
+
+def test_not_moved_by_arrival_ends_move(model):
+    """Test a curtain that has not moved by the arrival ends the move."""
+    assert model.observe(0, model.arrival)
+    assert not model.moving
+    assert model.speed == DEFAULT_SPEED
+
+
+def test_unknown_start_position():
+    """Test a move from an unknown position is assumed to be there."""
+    model = SwitchBotCloudMotionModel()
+    model.start(None, 40, NOW)
+
+    assert model.estimate(NOW) == 40
+    assert model.observe(40, NOW + START_DELAY)
+
+
+def test_observe_without_move():
+    """Test a read without a move in progress is ignored."""
+    model = SwitchBotCloudMotionModel()
+
+    assert model.observe(10, NOW)
+    assert model.speed == DEFAULT_SPEED
+
+
+def test_stalled_short_of_target_ends_move(model):
+    """Test a curtain stuck short of its target ends the move there."""
+    assert not model.observe(50, model.arrival)
+    speed = model.speed
+
+    assert model.observe(50, model.arrival)
+    assert not model.moving
+    assert model.estimate() is None
+    assert model.speed == speed
+
+
+def test_stalled_read_before_arrival_keeps_move_open(model):
+    """Test no progress before the arrival neither ends the move nor learns."""
+    assert not model.observe(30, NOW + START_DELAY + 10)
+    speed = model.speed
+
+    assert not model.observe(30, NOW + START_DELAY + 11)
+    assert model.moving
+    assert model.speed == speed
+
+
+def test_moving_away_ends_move(model):
+    """Test a curtain sent back from its target ends the move."""
+    assert not model.observe(40, NOW + START_DELAY + 10)
+    speed = model.speed
+
+    assert model.observe(20, NOW + START_DELAY + 12)
+    assert not model.moving
+    assert model.speed == speed
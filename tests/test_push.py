@@ -0,0 +1,114 @@
+"""Tests for state changes pushed to the webhook."""
+import pytest
+
+from homeassistant.const import STATE_OFF, STATE_ON
+
+from custom_components.switchbot_cloud.const import CONF_PUSH
+
+pytestmark = [
+    pytest.mark.parametrize("config_entry", [{CONF_PUSH: True}], indirect=True),
+    pytest.mark.parametrize(
+        "fake_cloud",
+        [{"curtains": 2, "groups": 1, "bots": 1, "meters": 1, "plugs": 1}],
+        indirect=True,
+    ),
+]
+
+CURTAIN = "cover.wocurtain_1"
+PLUG = "switch.woplugus_7"
+SAMPLED = 1700000000000
+
+
+def _change_report(fake_cloud, index: int, sampled: int = SAMPLED, **fields) -> dict:
+    """Return a change report of a device of the fake cloud."""
+    return {
+        "eventType": "changeReport",
+        "eventVersion": "1",
+        "context": {
+            "deviceMac": fake_cloud.devices[index]["device_mac"],
+            "timeOfSample": sampled,
+            **fields,
+        },
+    }
+
+
+@pytest.fixture
+async def async_push(hass, hass_client_no_auth, account):
+    """Return a function posting an event to the webhook of the account."""
+    http = await hass_client_no_auth()
+
+    async def async_push(event, **kwargs):
+        response = await http.post(
+            f"/api/webhook/{account.webhook_id}", json=event, **kwargs
+        )
+        await hass.async_block_till_done()
+
+        return response.status
+
+    return async_push
+
+
+async def test_change_report(hass, fake_cloud, account, async_push):
+    """Test a change report updates the entity without a poll."""
+    requests = sum(fake_cloud.requests.values())
+
+    status = await async_push(_change_report(fake_cloud, 0, slidePosition=60))
+
+    assert status == 200
+    assert hass.states.get(CURTAIN).attributes["current_position"] == 40
+    assert sum(fake_cloud.requests.values()) == requests
+
+
+async def test_plug_power_state(hass, fake_cloud, account, async_push):
+    """Test a plug's upper case power state turns its switch on and off."""
+    assert hass.states.get(PLUG).state == STATE_OFF
+
+    assert await async_push(_change_report(fake_cloud, 6, powerState="ON")) == 200
+    assert hass.states.get(PLUG).state == STATE_ON
+
+    event = _change_report(fake_cloud, 6, SAMPLED + 1, powerState="OFF")
+
+    assert await async_push(event) == 200
+    assert hass.states.get(PLUG).state == STATE_OFF
+
+
+async def test_stale_and_duplicate_events_dropped(
+    hass, fake_cloud, account, async_push
+):
+    """Test an event not newer than the last of its device is dropped."""
+    await async_push(_change_report(fake_cloud, 0, slidePosition=60))
+
+    duplicate = _change_report(fake_cloud, 0, slidePosition=20)
+    stale = _change_report(fake_cloud, 0, SAMPLED - 1, slidePosition=20)
+
+    assert await async_push(duplicate) == 200
+    assert await async_push(stale) == 200
+    assert hass.states.get(CURTAIN).attributes["current_position"] == 40
+
+
+async def test_unknown_device_dropped(hass, fake_cloud, account, async_push):
+    """Test an event of a device not on the account is dropped."""
+    event = _change_report(fake_cloud, 0, slidePosition=60)
+    event["context"]["deviceMac"] = "FF:FF:FF:FF:FF:FF"
+
+    assert await async_push(event) == 200
+    assert hass.states.get(CURTAIN).attributes["current_position"] == 100
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        {"eventType": "other"},
+        {"eventType": "changeReport"},
+        {"eventType": "changeReport", "context": {"deviceMac": "00:00:00:00:00:01"}},
+    ],
+)
+async def test_malformed_event_rejected(hass, fake_cloud, account, async_push, event):
+    """Test an event that is not a change report is rejected."""
+    assert await async_push(event) == 400
+    assert hass.states.get(CURTAIN).attributes["current_position"] == 100
+
+
+async def test_invalid_json_rejected(hass, fake_cloud, account, async_push):
+    """Test a body that is not JSON is rejected."""
+    assert await async_push(None, data="not json") == 400
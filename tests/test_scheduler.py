@@ -0,0 +1,126 @@
+"""Tests for the poll scheduler."""
+from custom_components.switchbot_cloud.scheduler import (
+    ACTIVE_WINDOW,
+    BASE_INTERVAL,
+    BATTERY_INTERVAL,
+    FAST_INTERVAL,
+    JITTER,
+    LIST_INTERVAL,
+    MAX_INTERVAL,
+    SwitchBotCloudPollScheduler,
+)
+
+NOW = 1000.0
+
+
+def test_new_devices_due():
+    """Test devices are due as soon as they are seen."""
+    scheduler = SwitchBotCloudPollScheduler()
+
+    assert scheduler.list_due(NOW)
+    assert scheduler.devices_due(["a", "b"], NOW) == ["a", "b"]
+
+
+def test_list_interval():
+    """Test the device list is fetched every LIST_INTERVAL."""
+    scheduler = SwitchBotCloudPollScheduler()
+    scheduler.listed(["a"], NOW)
+
+    assert not scheduler.list_due(NOW + LIST_INTERVAL - 1)
+    assert scheduler.list_due(NOW + LIST_INTERVAL)
+
+
+def test_idle_backoff():
+    """Test an unchanged device backs off up to MAX_INTERVAL."""
+    scheduler = SwitchBotCloudPollScheduler()
+    now = NOW
+    intervals = []
+
+    for _ in range(6):
+        scheduler.record("a", False, False, now)
+        due = now + 1
+
+        while not scheduler.devices_due(["a"], due):
+            due += 1
+
+        intervals.append(due - now + FAST_INTERVAL)
+        now = due + FAST_INTERVAL
+
+    assert intervals == [60, 120, 240, MAX_INTERVAL, MAX_INTERVAL, MAX_INTERVAL]
+
+
+def test_change_polls_fast():
+    """Test a change polls the device fast for the active window."""
+    scheduler = SwitchBotCloudPollScheduler()
+    scheduler.record("a", True, False, NOW)
+
+    assert not scheduler.devices_due(["a"], NOW - 1)
+    assert scheduler.devices_due(["a"], NOW)
+
+    scheduler.record("a", False, False, NOW + ACTIVE_WINDOW - 1)
+
+    assert scheduler.devices_due(["a"], NOW + ACTIVE_WINDOW - 1)
+
+    scheduler.record("a", False, False, NOW + ACTIVE_WINDOW)
+
+    assert not scheduler.devices_due(["a"], NOW + ACTIVE_WINDOW + FAST_INTERVAL)
+
+
+def test_battery_only():
+    """Test devices that only report a battery level are polled hourly."""
+    scheduler = SwitchBotCloudPollScheduler()
+    scheduler.record("a", True, True, NOW)
+
+    assert not scheduler.devices_due(["a"], NOW + BATTERY_INTERVAL - 2 * FAST_INTERVAL)
+    assert scheduler.devices_due(["a"], NOW + BATTERY_INTERVAL - FAST_INTERVAL)
+
+
+def test_sensor_only():
+    """Test changes of sensor-only devices back off like idle devices."""
+    scheduler = SwitchBotCloudPollScheduler()
+    now = NOW
+
+    for interval in (2 * BASE_INTERVAL, 4 * BASE_INTERVAL):
+        scheduler.record("a", True, False, now, sensor_only=True)
+
+        assert not scheduler.devices_due(["a"], now + interval - 2 * FAST_INTERVAL)
+        assert scheduler.devices_due(["a"], now + interval - FAST_INTERVAL)
+
+        now += interval
+
+
+def test_expect():
+    """Test an expected time replaces the schedule of a device."""
+    scheduler = SwitchBotCloudPollScheduler()
+    scheduler.activity("a", NOW)
+    scheduler.expect("a", NOW + 100)
+
+    assert not scheduler.devices_due(["a"], NOW + 100 - FAST_INTERVAL - 1)
+    assert scheduler.devices_due(["a"], NOW + 100 - FAST_INTERVAL)
+
+
+def test_listed_forgets_removed_devices():
+    """Test devices no longer listed are forgotten."""
+    scheduler = SwitchBotCloudPollScheduler()
+    scheduler.record("a", False, True, NOW)
+    scheduler.listed(["b"], NOW)
+
+    assert scheduler.devices_due(["a"], NOW) == ["a"]
+
+
+def test_next_interval():
+    """Test the next interval is the earliest due poll, with jitter."""
+    scheduler = SwitchBotCloudPollScheduler()
+    scheduler.listed(["a", "b"], NOW)
+    scheduler.record("a", False, False, NOW)
+    scheduler.record("b", True, False, NOW)
+
+    delay = scheduler.next_interval(NOW).total_seconds()
+
+    assert FAST_INTERVAL * (1 - JITTER) <= delay <= FAST_INTERVAL * (1 + JITTER)
+
+    scheduler.record("b", False, True, NOW)
+    delay = scheduler.next_interval(NOW).total_seconds()
+
+    assert 2 * BASE_INTERVAL * (1 - JITTER) <= delay
+    assert delay <= 2 * BASE_INTERVAL * (1 + JITTER)
@@ -0,0 +1,131 @@
+"""Tests for the sensor platform."""
+import asyncio
+import copy
+
+import pytest
+
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity import EntityCategory
+
+from custom_components.switchbot_cloud.account import get_account_from_config_entry
+from custom_components.switchbot_cloud.budget import DEFAULT_DAILY_LIMIT
+from custom_components.switchbot_cloud.const import (
+    CONF_BATTERY_DEADBAND,
+    STORAGE_KEY,
+    STORAGE_VERSION,
+)
+
+from .common import async_poll, join_worker_threads
+
+BATTERY = "sensor.wocurtain_1_battery_level"
+SLAVE_BATTERY = "sensor.wocurtain_4_battery_level"
+TEMPERATURE = "sensor.wometerth_6_temperature"
+REMAINING = "sensor.user_example_com_remaining_requests"
+LATENCY = "sensor.user_example_com_cloud_latency"
+
+
+@pytest.mark.parametrize("config_entry", [{CONF_BATTERY_DEADBAND: 5}], indirect=True)
+async def test_battery_deadband(hass, fake_cloud, account):
+    """Test battery changes within the dead-band are not written."""
+    values = fake_cloud.statuses[fake_cloud.device_id(0)]["status"]
+
+    assert hass.states.get(BATTERY).state == "90"
+
+    values["battery"] = 88
+    await async_poll(hass, account)
+
+    assert hass.states.get(BATTERY).state == "90"
+
+    values["battery"] = 80
+    await async_poll(hass, account)
+
+    assert hass.states.get(BATTERY).state == "80"
+
+
+async def test_meter_reading(hass, fake_cloud, account):
+    """Test a meter reading is written when it changes."""
+    assert hass.states.get(TEMPERATURE).state == "20.5"
+
+    fake_cloud.statuses[fake_cloud.device_id(5)]["status"]["temperature"] = 21.0
+    await async_poll(hass, account)
+
+    assert hass.states.get(TEMPERATURE).state == "21.0"
+
+
+async def test_removed_group_member_removes_battery(hass, fake_cloud, account):
+    """Test a curtain taken out of a group loses its battery sensor."""
+    master = fake_cloud.devices[2]
+    fake_cloud.devices.pop(3)
+    master["deviceLinks"] = [master["device_mac"]]
+
+    assert er.async_get(hass).async_get(SLAVE_BATTERY) is not None
+
+    await async_poll(hass, account)
+
+    assert er.async_get(hass).async_get(SLAVE_BATTERY) is None
+    assert hass.states.get("cover.wocurtain_3") is not None
+
+
+async def test_restored_state_until_reconciled(
+    hass, hass_storage, fake_cloud, config_entry
+):
+    """Test stored state is shown, and marked, until the cloud is read."""
+    devices = {
+        fake_cloud.device_id(i): device for i, device in enumerate(fake_cloud.devices)
+    }
+    statuses = copy.deepcopy(fake_cloud.statuses)
+    statuses[fake_cloud.device_id(5)]["status"]["temperature"] = 18.0
+    key = STORAGE_KEY.format(config_entry.entry_id)
+    hass_storage[key] = {
+        "version": STORAGE_VERSION,
+        "key": key,
+        "data": {"tokens": {}, "devices": devices, "statuses": statuses},
+    }
+    fake_cloud.latency = 0.1
+
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    account = get_account_from_config_entry(hass, config_entry)
+    await asyncio.gather(*account._setup_tasks)
+
+    state = hass.states.get(TEMPERATURE)
+
+    assert state.state == "18.0"
+    assert state.attributes["restored"]
+    assert fake_cloud.requests["get_devices"] == 0
+
+    await hass.async_block_till_done()
+    state = hass.states.get(TEMPERATURE)
+
+    assert state.state == "20.5"
+    assert "restored" not in state.attributes
+
+    await hass.config_entries.async_unload(config_entry.entry_id)
+    await hass.async_block_till_done()
+    join_worker_threads()
+
+
+async def test_requests_used_survive_reload(hass, fake_cloud, config_entry, account):
+    """Test the requests used today are still counted after a reload."""
+    account.client.budget.used = 500
+
+    assert await hass.config_entries.async_reload(config_entry.entry_id)
+    await hass.async_block_till_done()
+    account = get_account_from_config_entry(hass, config_entry)
+
+    assert account.client.budget.used >= 500
+    assert int(hass.states.get(REMAINING).state) <= DEFAULT_DAILY_LIMIT - 500
+
+
+async def test_metric_sensors_diagnostic(hass, fake_cloud, config_entry, account):
+    """Test the metric sensors are diagnostic and keep their stats out of state."""
+    registry = er.async_get(hass)
+    entry = registry.async_get(LATENCY)
+
+    assert entry.entity_category == EntityCategory.DIAGNOSTIC
+    assert entry.disabled
+
+    registry.async_update_entity(LATENCY, disabled_by=None)
+    assert await hass.config_entries.async_reload(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert "snapshot" not in hass.states.get(LATENCY).attributes
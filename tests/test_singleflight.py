@@ -0,0 +1,105 @@
+"""Tests for single-flight reads."""
+import asyncio
+
+import pytest
+
+from custom_components.switchbot_cloud import singleflight
+from custom_components.switchbot_cloud.singleflight import SwitchBotCloudSingleFlight
+
+
+@pytest.fixture
+def reads(monkeypatch, clock):
+    """Return single-flight reads running on the test clock."""
+    monkeypatch.setattr(singleflight, "time", clock)
+
+    return SwitchBotCloudSingleFlight()
+
+
+def _counting_read(calls: list, delay: float = 0):
+    """Return a read that counts its calls."""
+
+    async def read():
+        calls.append(None)
+        await asyncio.sleep(delay)
+        return len(calls)
+
+    return read
+
+
+async def test_concurrent_callers_share_read(reads):
+    """Test callers at the same time share one read."""
+    calls = []
+    read = _counting_read(calls, 0.01)
+
+    results = await asyncio.gather(*(reads.async_run("key", read) for _ in range(5)))
+
+    assert results == [1] * 5
+    assert len(calls) == 1
+
+
+async def test_ttl(reads, clock):
+    """Test a result is reused within its TTL."""
+    calls = []
+    read = _counting_read(calls)
+
+    assert await reads.async_run("key", read, 2) == 1
+    assert await reads.async_run("key", read, 2) == 1
+
+    clock.advance(2)
+
+    assert await reads.async_run("key", read, 2) == 2
+
+
+async def test_invalidate(reads):
+    """Test an invalidated key is read again."""
+    calls = []
+    read = _counting_read(calls)
+
+    await reads.async_run("key", read, 60)
+    reads.invalidate("key")
+
+    assert await reads.async_run("key", read, 60) == 2
+
+
+async def test_error_not_cached(reads):
+    """Test a failed read is not reused."""
+    calls = []
+
+    async def fail():
+        calls.append(None)
+        raise ValueError("failed")
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            await reads.async_run("key", fail, 60)
+
+    assert len(calls) == 2
+
+
+async def test_cancelled_caller_keeps_read(reads):
+    """Test a cancelled caller does not cancel the read of the others."""
+    calls = []
+    read = _counting_read(calls, 0.01)
+
+    first = asyncio.ensure_future(reads.async_run("key", read))
+    second = asyncio.ensure_future(reads.async_run("key", read))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == 1
+
+
+async def test_clear(reads):
+    """Test clearing cancels reads in progress."""
+    started = asyncio.Event()
+
+    async def read():
+        started.set()
+        await asyncio.sleep(10)
+
+    caller = asyncio.ensure_future(reads.async_run("key", read))
+    await started.wait()
+    await reads.async_clear()
+
+    with pytest.raises(asyncio.CancelledError):
+        await caller
@@ -0,0 +1,58 @@
+"""Tests for the switch platform."""
+from homeassistant.components.switch import DOMAIN as SWITCH_DOMAIN
+from homeassistant.const import ATTR_ENTITY_ID, SERVICE_TURN_ON, STATE_OFF, STATE_ON
+
+from .common import async_poll
+
+BOT = "switch.wohand_5"
+
+
+async def _async_turn_on(hass) -> None:
+    """Turn the bot on through its service."""
+    await hass.services.async_call(
+        SWITCH_DOMAIN, SERVICE_TURN_ON, {ATTR_ENTITY_ID: BOT}, blocking=True
+    )
+
+
+async def test_turn_on(hass, fake_cloud, account):
+    """Test a bot in switch mode is turned on and stays on."""
+    device_id = fake_cloud.device_id(4)
+
+    assert hass.states.get(BOT).state == STATE_OFF
+
+    await _async_turn_on(hass)
+
+    assert fake_cloud.commands == [(device_id, "turnOn")]
+    assert hass.states.get(BOT).state == STATE_ON
+
+    await async_poll(hass, account)
+
+    assert hass.states.get(BOT).state == STATE_ON
+
+
+async def test_press_is_undone_by_poll(hass, fake_cloud, account):
+    """Test a pressed bot shows on until the next poll reads it off."""
+    device_id = fake_cloud.device_id(4)
+    fake_cloud.statuses[device_id]["deviceMode"] = "0"
+    await async_poll(hass, account)
+
+    await _async_turn_on(hass)
+
+    assert fake_cloud.commands == [(device_id, "press")]
+    assert hass.states.get(BOT).state == STATE_ON
+
+    await async_poll(hass, account)
+
+    assert hass.states.get(BOT).state == STATE_OFF
+
+
+async def test_unchanged_state_not_written(hass, fake_cloud, account):
+    """Test polls that change nothing do not write the state again."""
+    await async_poll(hass, account)
+    updated = hass.states.get(BOT).last_updated
+    suppressed = account.coordinator.suppressed_writes
+
+    await async_poll(hass, account)
+
+    assert hass.states.get(BOT).last_updated == updated
+    assert account.coordinator.suppressed_writes > suppressed